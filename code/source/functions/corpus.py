@@ -0,0 +1,207 @@
+import os
+import numpy as np
+
+from functions.map import map
+
+# line separating two maps in a concatenated .map file (see append_map)
+map_separator = "---\n"
+# header of a binary corpus: magic number, version, number of maps, total vertices, total edges, total entities
+corpus_magic = 0x6B686E636F727073
+corpus_version = 1
+# columns of the index of a binary corpus (one row per map)
+corpus_index = ("vertex_start", "n_vertices", "offset_start", "edge_start", "n_edges", "entity_start", "n_entities", "end", "size_parameter")
+
+def save_corpus(maps, filename):
+	"""
+	description:
+		Save a collection of maps in a single binary file (filename) made of
+		fixed-width sections (all the maps are concatenated in each section):
+			1. header (6 int64, see corpus_magic and corpus_version);
+			2. index (one row of len(corpus_index) int64 per map);
+			3. coordinates (int32, two per vertex);
+			4. CSR offsets (int32, n_vertices + 1 per map);
+			5. CSR targets and 6. CSR weights (int32, one per edge);
+			7. entities (int32, vertex and power per entity, in the order of the map).
+		The vertices of each map are supposed to be labelled 0, ..., n - 1.
+		The file can be opened with map_corpus.
+	syntax:
+		save_corpus(maps, filename)
+	"""
+	index, coordinates, offsets, targets, weights, entities = [], [], [], [], [], []
+	vertex_start, offset_start, edge_start, entity_start = 0, 0, 0, 0
+	for m in maps:
+		fm = m.freeze()
+		map_offsets, map_targets, map_weights = fm.get_csr()
+		n_vertices, n_edges, n_entities = len(fm.get_powers()), len(map_targets), len(fm.get_entities())
+		index.append([vertex_start, n_vertices, offset_start, edge_start, n_edges, entity_start, n_entities, 
+			fm.get_end(), fm.get_size_parameter()])
+		coordinates.append(fm._coordinates.ravel())
+		offsets.append(map_offsets)
+		targets.append(map_targets)
+		weights.append(map_weights)
+		entities.append(np.array(list(fm.get_entities().items()), dtype = np.int32).ravel())
+		vertex_start += n_vertices
+		offset_start += n_vertices + 1
+		edge_start += n_edges
+		entity_start += n_entities
+	header = np.array([corpus_magic, corpus_version, len(index), vertex_start, edge_start, entity_start], dtype = np.int64)
+	with open(filename, "wb") as file:
+		file.write(header.tobytes())
+		file.write(np.array(index, dtype = np.int64).reshape(-1, len(corpus_index)).tobytes())
+		for section in (coordinates, offsets, targets, weights, entities):
+			file.write(np.concatenate(section + [np.zeros(0, dtype = np.int32)]).astype(np.int32).tobytes())
+
+class map_corpus():
+
+	def __init__(self, filename):
+		"""
+		description:
+			Open a binary corpus created by save_corpus through a memory map:
+			the sections are views of the file, hence the map i is read (and parsed)
+			only when it is accessed (corpus[i]).
+		syntax:
+			corpus = map_corpus(filename)
+		"""
+		self._raw = np.memmap(filename, dtype = np.uint8, mode = "r")
+		header = self._raw[:48].view(np.int64)
+		if header[0] != corpus_magic or header[1] != corpus_version:
+			raise ValueError("unsupported corpus file: " + str(filename))
+		n_maps, total_vertices, total_edges, total_entities = header[2:6].tolist()
+		sizes = [("index", 8 * n_maps * len(corpus_index)), ("coordinates", 4 * 2 * total_vertices), 
+			("offsets", 4 * (total_vertices + n_maps)), ("targets", 4 * total_edges), ("weights", 4 * total_edges), 
+			("entities", 4 * 2 * total_entities)]
+		position = 48
+		self._sections = {}
+		for name, size in sizes:
+			self._sections[name] = self._raw[position:(position + size)]
+			position += size
+		self._index = self._sections["index"].view(np.int64).reshape(n_maps, len(corpus_index))
+		self._coordinates = self._sections["coordinates"].view(np.int32).reshape(-1, 2)
+		self._offsets = self._sections["offsets"].view(np.int32)
+		self._targets = self._sections["targets"].view(np.int32)
+		self._weights = self._sections["weights"].view(np.int32)
+		self._entities = self._sections["entities"].view(np.int32).reshape(-1, 2)
+
+	def __len__(self):
+		"""
+		description:
+			Return the number of maps in the corpus.
+		syntax:
+			n = len(corpus)
+		"""
+		return len(self._index)
+
+	def __getitem__(self, i):
+		"""
+		description:
+			Build the map i of the corpus (m._stamina_life is computed lazily).
+		syntax:
+			m = corpus[i]
+		"""
+		if i < 0:
+			i += len(self)
+		if not(0 <= i < len(self)):
+			raise IndexError("corpus index out of range")
+		vertex_start, n_vertices, offset_start, edge_start, n_edges, entity_start, n_entities, end, size_parameter = self._index[i].tolist()
+		m = map()
+		m._size_parameter = size_parameter
+		for v, coord in enumerate(self._coordinates[vertex_start:(vertex_start + n_vertices)].tolist()):
+			m._insert_vertex(v, coord)
+		offsets = self._offsets[offset_start:(offset_start + n_vertices + 1)].tolist()
+		targets = self._targets[edge_start:(edge_start + n_edges)].tolist()
+		weights = self._weights[edge_start:(edge_start + n_edges)].tolist()
+		for u in range(n_vertices):
+			for k in range(offsets[u], offsets[u + 1]):
+				m._insert_edge((u, targets[k]), weights[k])
+		m._end = end
+		for v, power in self._entities[entity_start:(entity_start + n_entities)].tolist():
+			m._entities[v] = power
+		return m
+
+	def __iter__(self):
+		"""
+		description:
+			Iterate over the maps of the corpus.
+		syntax:
+			for m in corpus:
+		"""
+		for i in range(len(self)):
+			yield self[i]
+
+def append_map(m, filename):
+	"""
+	description:
+		Append the map m to a concatenated .map file (filename): the maps are
+		written in the format of m.save, separated by the line map_separator.
+		The file is created if it does not exist.
+	syntax:
+		append_map(m, filename)
+	"""
+	with open(filename, "a") as file:
+		if file.tell() > 0:
+			file.write(map_separator)
+		file.write(m._to_text())
+
+def _parsed_map(lines, solve):
+	"""
+	description:
+		Build a map from the lines of a .map file (if solve is True its 
+		m._stamina_life is computed too).
+	syntax:
+		m = _parsed_map(lines, solve)
+	"""
+	m = map()
+	m._parse(lines)
+	if solve:
+		m._compute_stamina_life()
+	return m
+
+def _stream_maps(source, solve):
+	"""
+	description:
+		Yield the maps of source one at a time: source is either a directory 
+		(every .map file, in alphabetical order) or a concatenated .map file 
+		(see append_map), which is read line by line.
+	syntax:
+		for m in _stream_maps(source, solve):
+	"""
+	if os.path.isdir(source):
+		for name in sorted(os.listdir(source)):
+			if name.endswith(".map"):
+				with open(os.path.join(source, name), "r") as file:
+					lines = file.readlines()
+				yield _parsed_map(lines, solve)
+		return
+	with open(source, "r") as file:
+		lines = []
+		for line in file:
+			if line == map_separator:
+				yield _parsed_map(lines, solve)
+				lines = []
+			else:
+				lines.append(line)
+		if lines:
+			yield _parsed_map(lines, solve)
+
+def iterate_maps(source, chunk_size = None, solve = False):
+	"""
+	description:
+		Generator over the maps stored in source (a directory of .map files or 
+		a concatenated .map file, see append_map): the maps are parsed lazily, one 
+		at a time, hence the memory does not depend on the size of the collection.
+		If chunk_size is given the maps are yielded in lists of (at most) chunk_size maps.
+		The solver (m._stamina_life) is skipped unless solve is True.
+	syntax:
+		for m in iterate_maps(source):
+	"""
+	if chunk_size is None:
+		yield from _stream_maps(source, solve)
+		return
+	chunk = []
+	for m in _stream_maps(source, solve):
+		chunk.append(m)
+		if len(chunk) == chunk_size:
+			yield chunk
+			chunk = []
+	if chunk:
+		yield chunk
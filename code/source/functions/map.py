@@ -2,48 +2,105 @@ import networkx as nx
 import matplotlib.pyplot as plt
 import random
 import numpy as np
-import itertools
 from scipy import sparse
+from scipy.sparse import csgraph
 from heapq import heappop, heappush
 import copy
+import os
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType
 
-from functions.itertools_addendum import *
 from functions.nx_addendum import *
 from functions.tk_extension import tk_clear, tk_plot
 
+# version of the format of the solver cache (see map._cached_stamina_life), 
+#	the files with a different version are ignored
+cache_version = 2
+
 class map():
 
-	def __init__(self, generate = 0):
+	def __init__(self, generate = 0, repair = False, seed = None):
 		"""
 		description:
 			Inizialization of an empty map (the map() class implements 
 			a graph structure with dictionaries with several additional
 			specifications).
+			If repair is True the generated maps are repaired instead of
+			being rejected (see m._generate).
+			If seed is given the map draws from its own random.Random(seed)
+			instance (the result is the same of random.seed(seed) followed
+			by map(generate)), otherwise from the global random state.
+			The dictionary m._stamina_life is computed lazily (see m.get_parameters).
 		syntax:
 			m = map()
 		"""
+		self._random = random if seed is None else random.Random(seed)
 		self._size_parameter = generate
 		self._coordinates = {}
+		self._coordinates_index = {}
 		self._vertices = {}
+		self._predecessors = {}
 		self._end = None
 		self._entities = {}
 		self._stamina_life = {}
+		self._targeted_parameters = {}
+		self._lives = None
+		self._pair_distances = {}
+		self._dijkstra_buffers = None
 		if generate != 0:
 			flag = False
 			while not(flag):
-				self._coordinates = {}
-				self._vertices = {}
-				self._entities = {}
-				flag = self._generate(generate)
+				self._reset()
+				flag = self._generate(generate, repair = repair)
 			self._add_entities()
-			self._compute_stamina_life()
+
+	def _reset(self):
+		"""
+		description:
+			Remove all the vertices, edges and entities of the map 
+			(together with the indexes m._predecessors and m._coordinates_index).
+		syntax:
+			m._reset()
+		"""
+		self._coordinates = {}
+		self._coordinates_index = {}
+		self._vertices = {}
+		self._predecessors = {}
+		self._entities = {}
+
+	def __getstate__(self):
+		"""
+		description:
+			Return the state of the map for pickle/copy (the global random 
+			module cannot be pickled, hence it is replaced by None).
+		syntax:
+			state = m.__getstate__()
+		"""
+		state = self.__dict__.copy()
+		if state["_random"] is random:
+			state["_random"] = None
+		return state
+
+	def __setstate__(self, state):
+		"""
+		description:
+			Restore the state of the map (see m.__getstate__).
+		syntax:
+			m.__setstate__(state)
+		"""
+		self.__dict__.update(state)
+		if self._random is None:
+			self._random = random
 
 	def _insert_vertex(self, v, coord):
 		""" 
 		description:
 			Insert a vertex v to the graph, it adds an entry corresponding 
-			to v in the dictionary m._vertices and an entry with its 
-			coordinates in the dictionary m._coordinates. 
+			to v in the dictionaries m._vertices and m._predecessors and an 
+			entry with its coordinates in the dictionary m._coordinates
+			(and the inverse one in m._coordinates_index). 
 			The coordinates are supposed to be a tuple with lenght 2.
 		syntax:
 			m._insert_vertex(v, coord)
@@ -51,7 +108,9 @@ class map():
 		v = int(v)
 		if v not in self._vertices:
 			self._coordinates[v] = (int(coord[0]), int(coord[1]))
+			self._coordinates_index.setdefault(self._coordinates[v], v)
 			self._vertices[v] = {}
+			self._predecessors[v] = {}
 
 	def _remove_vertex(self, v):
 		""" 
@@ -59,14 +118,19 @@ class map():
 			Remove a vertex v from the graph, it removes the entry 
 			corresponding to v in both the dictionaries 
 			(m._vertices and m._coordinates). 
-			It also removes all the edges containing v.
+			It also removes all the edges containing v (the incoming ones
+			are retrieved through m._predecessors, hence the cost is 
+			proportional to the degree of v).
 		syntax:
 			m._remove_vertex(v)	
 		"""
-		self._vertices.pop(v, None)
-		self._coordinates.pop(v, None)
-		for u in self._vertices:
+		for u in self._vertices.pop(v, {}):
+			self._predecessors[u].pop(v, None)
+		for u in self._predecessors.pop(v, {}):
 			self._vertices[u].pop(v, None)
+		coord = self._coordinates.pop(v, None)
+		if self._coordinates_index.get(coord) == v:
+			self._coordinates_index.pop(coord)
 
 	def _insert_edge(self, edge, weight):
 		""" 
@@ -81,6 +145,7 @@ class map():
 		u = int(u)
 		v = int(v)
 		(self._vertices[u])[v] = weight
+		self._predecessors.setdefault(v, {})[u] = weight
 
 	def _remove_edge(self, edge):
 		""" 
@@ -92,6 +157,8 @@ class map():
 		"""
 		u, v = tuple(edge)
 		self._vertices[u].pop(v, None)
+		if v in self._predecessors:
+			self._predecessors[v].pop(u, None)
 
 	def get_size_parameter(self):
 		""" 
@@ -157,14 +224,21 @@ class map():
 		"""
 		return self._entities
 	
-	def get_parameters(self, gamemode):
+	def get_parameters(self, gamemode, targeted = False):
 		""" 
 		description:
 			Return a list with life, stamina and their corresponding path
 			associated to the gamemode.
+			The dictionary m._stamina_life is computed at the first call.
+			If targeted is True and m._stamina_life has not been computed yet,
+			only the entry needed by the gamemode is computed (see m._compute_targeted_parameters).
 		syntax:
 			parameters = m.get_parameters(gamemode)
 		"""
+		if not(self._stamina_life):
+			if targeted:
+				return self._compute_targeted_parameters(gamemode)
+			self._compute_stamina_life()
 		lives = list(self._stamina_life.keys())
 		lives.sort()
 		if gamemode  == "balanced":
@@ -176,6 +250,30 @@ class map():
 		stamina = self._stamina_life[life][0]
 		path = self._stamina_life[life][1]
 		return [life, stamina, path]
+
+	def _compute_targeted_parameters(self, gamemode):
+		""" 
+		description:
+			Compute (and store in m._targeted_parameters) the list [life, stamina, path] 
+			associated to the gamemode without computing the whole m._stamina_life: 
+			the life is the minimum or maximum achievable one (see m._extreme_life) or 
+			the median of the achievable ones (see m._achievable_lives) and its best 
+			stamina is found by a targeted search with early termination (see m._label_search).
+		syntax:
+			parameters = m._compute_targeted_parameters(gamemode)
+		"""
+		if gamemode not in self._targeted_parameters:
+			if gamemode  == "balanced":
+				lives = self._achievable_lives()
+				life, dominance = lives[len(lives) // 2], None
+			elif gamemode == "survivor":
+				life, dominance = self._extreme_life(), "subset"
+			elif gamemode == "explorer":
+				life, dominance = self._extreme_life(maximum = True), "superset"
+			stamina, path = self._label_search(life, dominance)[life]
+			self._targeted_parameters[gamemode] = [life, stamina, path]
+		life, stamina, path = self._targeted_parameters[gamemode]
+		return [life, stamina, list(path)]
 	
 	def get_stamina_life(self, path):
 		""" 
@@ -222,10 +320,20 @@ class map():
 		neighbours = set()
 		if v in self._vertices:
 			neighbours = set(self._vertices[v].keys())
-			for u in self._vertices:
-				if v in self._vertices[u]:
-					neighbours.add(u)
+			neighbours.update(self._predecessors[v].keys())
 		return list(neighbours)
+
+	def predecessors(self, v):
+		""" 
+		description:
+			Returns a list containing the vertices u such that there 
+			exists an edge from u to v.
+		syntax:
+			predecessors = m.predecessors(v)
+		"""
+		if v in self._predecessors:
+			return list(self._predecessors[v].keys())
+		return []
 	
 	def check_adjacent(self, u, v):
 		""" 
@@ -260,13 +368,11 @@ class map():
 			Find the label of a vertex inside the graph starting from its 
 			coordinates (tuple).
 			If the coordinates do not corresponds to any label it returns -1.
+			The lookup is made in constant time through m._coordinates_index.
 		syntax:
 			v = m._find_vertex_from_coord(coord)
 		"""
-		try:
-			return list(self._coordinates.keys())[list(self._coordinates.values()).index(coord)]
-		except:
-			return -1
+		return self._coordinates_index.get(tuple(coord), -1)
 		
 	def _check_link(self, start, end, verbose = False):
 		""" 
@@ -294,11 +400,176 @@ class map():
 			print("error_check_link:", str(start) + "-" + str(end))
 		return False
 	
-	def _generate(self, bound, verbose = False):
+	def _check_reaching(self, end, verbose = False):
+		""" 
+		description:
+			Check whether every vertex of the graph can reach end through a single 
+			BFS visit from end over the reversed edges (i.e. over m._predecessors).
+			Returns the list of the vertices that cannot reach end (it is empty
+			if the check is passed).
+			Verbose mode available.
+		syntax:
+			unreachable = m._check_reaching(end)
+		"""
+		explored = {end}
+		queue = [end]
+		for v in queue:
+			for u in self._predecessors[v]:
+				if u not in explored:
+					explored.add(u)
+					queue.append(u)
+		unreachable = [u for u in self._vertices if u not in explored]
+		if verbose == True:
+			for u in unreachable:
+				print("error_check_link:", str(u) + "-" + str(end))
+		return unreachable
+
+	def _strongly_connected_components(self, vertices = None):
+		""" 
+		description:
+			Compute the strongly connected components of the subgraph induced by
+			vertices (by default the whole graph) through the Kosaraju algorithm
+			(both the DFS visits are iterative).
+			Returns a list of lists of vertices.
+		syntax:
+			components = m._strongly_connected_components()
+		"""
+		if vertices is None:
+			vertices = list(self._vertices.keys())
+		inside = set(vertices)
+		# first visit: order the vertices by finishing time
+		order = []
+		explored = set()
+		for start in vertices:
+			if start in explored:
+				continue
+			explored.add(start)
+			stack = [(start, iter(self._vertices[start]))]
+			while stack:
+				u, successors = stack[-1]
+				for v in successors:
+					if v in inside and v not in explored:
+						explored.add(v)
+						stack.append((v, iter(self._vertices[v])))
+						break
+				else:
+					stack.pop()
+					order.append(u)
+		# second visit: over the reversed edges, by decreasing finishing time
+		components = []
+		assigned = set()
+		for start in reversed(order):
+			if start in assigned:
+				continue
+			assigned.add(start)
+			component = [start]
+			for u in component:
+				for v in self._predecessors[u]:
+					if v in inside and v not in assigned:
+						assigned.add(v)
+						component.append(v)
+			components.append(component)
+		return components
+
+	def _edge_cells(self, coord, direction, step, bound):
+		""" 
+		description:
+			Return the cells of the location matrix (see m._generate) crossed by 
+			the edge starting from coord with the given direction and step.
+			They alternate half nodes and integer nodes, the last one is the arrival node.
+		syntax:
+			cells_x, cells_y = m._edge_cells(coord, direction, step, bound)
+		"""
+		# the j-th cell is (coord + bound) * 2 + direction * j for j = 1, ..., 2 * step
+		cells = np.arange(1, 2 * step + 1)
+		cells_x = (coord[0] + bound) * 2 + direction[0] * cells
+		cells_y = (coord[1] + bound) * 2 + direction[1] * cells
+		return cells_x, cells_y
+
+	def _legal_edges(self, sources, targets, location, bound):
+		""" 
+		description:
+			Return the list of the edges [source, target, weight] from a vertex in sources
+			to a vertex in targets that could be added to the map without breaking the rules
+			of m._generate, i.e. either the backward edge of an existing one or
+			a new edge that never passes on already taken nodes of location.
+		syntax:
+			edges = m._legal_edges(sources, targets, location, bound)
+		"""
+		directions = ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1))
+		max_step = 3
+		edges = []
+		for u in sources:
+			x, y = self._coordinates[u]
+			for direction in directions:
+				for step in range(1, max_step + 1):
+					v = self._find_vertex_from_coord((x + direction[0] * step, y + direction[1] * step))
+					if v == -1 or v not in targets or self.check_adjacent(u, v):
+						continue
+					if self.check_adjacent(v, u):
+						edges.append([u, v, step])
+						continue
+					cells_x, cells_y = self._edge_cells((x, y), direction, step, bound)
+					if not(location[cells_x[:-1], cells_y[:-1]].any()):
+						edges.append([u, v, step])
+		return edges
+
+	def _repair(self, location, bound, verbose = False):
+		""" 
+		description:
+			Repair a generated map adding edges until every vertex can reach the end.
+			The vertices which cannot reach the end are split in strongly connected
+			components: each sink component needs at least one new outgoing edge,
+			hence (when possible) exactly one legal edge towards a vertex which already
+			reaches the end is added for each of them.
+			If a sink component cannot be directly linked, a legal edge towards any other
+			vertex is added and the components are recomputed.
+			Returns False only if no legal edge can be added.
+			Verbose mode available.
+		syntax:
+			bool = m._repair(location, bound)
+		"""
+		unreachable = self._check_reaching(self._end)
+		while unreachable:
+			components = self._strongly_connected_components(unreachable)
+			component_of = {}
+			for i in range(len(components)):
+				for u in components[i]:
+					component_of[u] = i
+			reaching = set(self._vertices) - set(unreachable)
+			progress = False
+			for i in range(len(components)):
+				# skip the components which are not sinks
+				if any(component_of[v] != i for u in components[i] for v in self._vertices[u]):
+					continue
+				edges = self._legal_edges(components[i], reaching, location, bound)
+				if not(edges):
+					edges = self._legal_edges(components[i], set(self._vertices) - set(components[i]), location, bound)
+				if not(edges):
+					continue
+				u, v, step = self._random.choice(edges)
+				if verbose == True:
+					print("repair_edge:", str(u) + "-" + str(v))
+				if not(self.check_adjacent(v, u)):
+					cells_x, cells_y = self._edge_cells(self._coordinates[u], self.diff_coordinates(u, v), step, bound)
+					location[cells_x[:-1], cells_y[:-1]] = 2
+				self._insert_edge((u, v), step)
+				progress = True
+			if not(progress):
+				if verbose == True:
+					print("error_repair:", len(unreachable), "unreachable vertices")
+				return False
+			unreachable = self._check_reaching(self._end)
+		return True
+
+	def _generate(self, bound, verbose = False, repair = False):
 		""" 
 		description:
 			Generate a map (vertices with their coordinates and edges) randomly.
 			It takes as argument a parameter bound which is correlated to the size of the map.
+			In repair mode the map is not rejected when it is too small (new rounds of expansion
+			from the current vertices are made, at most bound) or when some vertices cannot reach
+			the end (see m._repair).
 			Verbose mode available.
 		syntax:
 			bool = m._generate(bound)
@@ -309,7 +580,8 @@ class map():
 		#	0: not visited nodes (new)
 		#	1: occupied nodes (vertex)
 		#	2: visited nodes (edge)
-		location = sparse.lil_matrix((bound * 4 + 1, bound * 4 + 1))
+		#	(dense int8 array, since it is read and written cell by cell in the main loop)
+		location = np.zeros((bound * 4 + 1, bound * 4 + 1), dtype = np.int8)
 		directions = ((0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1))
 		max_step = 3
 		# max_vertex: number of possible vertices that could be inserted in the map divided by 4
@@ -319,23 +591,29 @@ class map():
 		location[2 * bound, 2 * bound] = 1
 		# next_vertex: label of the next vertex to be inserted
 		next_vertex = 1
+		# min_vertex: minimum number of vertices of the map
+		min_vertex = (bound * 2 + 1) ** 2 // 5
 		# visited: list of visited vertices
 		visited = [0]
-		for previous in visited:
+		# rounds: number of additional rounds of expansion (repair mode)
+		rounds = 0
+		for index, previous in enumerate(visited):
 			# previous: label of the current position
 			prev_x, prev_y = self._coordinates[previous]
-			n_neighbours = random.randint(1, 3)
+			n_neighbours = self._random.randint(1, 3)
 			for _ in range(n_neighbours):
 				flag = False
 				while not(flag):
 					# generate randomly direction and step
-					direction = random.choice(directions)
-					step = random.randint(1, max_step)
+					direction = self._random.choice(directions)
+					step = self._random.randint(1, max_step)
 					# check of being inside the boundaries:
 					#	if we are outside of the boundaries (vertically or horizontally) then continue
 					if not(prev_x + direction[0] * step + bound in range(bound * 2 + 1)) or \
 						not(prev_y + direction[1] * step + bound in range(bound * 2 + 1)):
 						continue
+					# cells of location crossed by the edge (alternating half nodes and integer nodes)
+					cells_x, cells_y = self._edge_cells((prev_x, prev_y), direction, step, bound)
 					# try to find the arrival vertex (actually its label) inside the map (if it is not in the map it returns -1)
 					vertex = self._find_vertex_from_coord((prev_x + direction[0] * step, prev_y + direction[1] * step))
 					# backward edge:
@@ -349,25 +627,15 @@ class map():
 					if next_vertex == max_vertex and vertex == -1:
 						continue
 					# check correctness edge:
-					flag = True
+					values = location[cells_x, cells_y]
 					#	the flag is true if:
 					#		the edge never passes on already taken nodes in the map (1 or 2 in location),
-					#		the last half node is analyzed separately
-					#		(check both integer and half nodes)
-					for i in range(1, step):
-						# 	- half nodes
-						flag = flag and (location[(prev_x + direction[0] * i + bound) * 2 - direction[0], \
-							(prev_y + direction[1] * i + bound) * 2 - direction[1]] == 0)
-						# 	- integer nodes
-						flag = flag and (location[(prev_x + direction[0] * i + bound) * 2, (prev_y + direction[1] * i + bound) * 2] == 0)
-					# 	- last half node
-					flag = flag and (location[(prev_x + direction[0] * step + bound) * 2 - direction[0], \
-							(prev_y + direction[1] * step + bound) * 2 - direction[1]] == 0)
-					#	same check for the last node taking in account that it is allowed to end in an already taken node (if it is a vertex)
-					#	(note: location[vertex] = 0/1, it cannot be 2)
-					flag = flag and (location[(prev_x + direction[0] * step + bound) * 2, (prev_y + direction[1] * step + bound) * 2] in [0, 1])
+					#		the arrival node is checked separately
+					#		taking in account that it is allowed to end in an already taken node (if it is a vertex)
+					#		(note: location[vertex] = 0/1, it cannot be 2)
+					flag = not(values[:-1].any()) and values[-1] != 2
 				# there is a probability of 0.5 to generate symmetric edges (back <= prob)
-				back = random.random()
+				back = self._random.random()
 				prob = 0.5
 				# if we are adding a new vertex 
 				# 	then we insert both vertex and edge (also to the queue visited), in case we also add the backward edge
@@ -386,28 +654,26 @@ class map():
 					if back <= prob and not(self.check_adjacent(vertex, previous)):
 						self._insert_edge((vertex, previous), step)
 				# update of the location matrix (following the rules at the beginning of the function)
-				for i in range(1, step):
-					#	- half nodes crossed by an edge
-					location[(prev_x + direction[0] * i + bound) * 2 - direction[0], \
-							(prev_y + direction[1] * i + bound) * 2 - direction[1]] = 2
-					#	- nodes crossed by an edge
-					location[(prev_x + direction[0] * i + bound) * 2, (prev_y + direction[1] * i + bound) * 2] = 2
-				#	- last half node crossed by an edge
-				location[(prev_x + direction[0] * step + bound) * 2 - direction[0], \
-							(prev_y + direction[1] * step + bound) * 2 - direction[1]] = 2
+				#	- half nodes and nodes crossed by an edge
+				location[cells_x[:-1], cells_y[:-1]] = 2
 				#	- last node occupied by a vertex
-				location[(prev_x + direction[0] * step + bound) * 2, (prev_y + direction[1] * step + bound) * 2] = 1
-		flag = True
+				location[cells_x[-1], cells_y[-1]] = 1
+			# repair mode: if the queue is exhausted and there are too few vertices
+			#	then start a new round of expansion from all the current vertices
+			if repair and index == len(visited) - 1 and next_vertex < min_vertex and rounds < bound:
+				visited += list(self._vertices.keys())
+				rounds += 1
 		# check number of vertices is in [(bound * 2 + 1) ** 2 // 5, (bound * 2 + 1) ** 2 // 4]
-		if next_vertex < (bound * 2 + 1) ** 2 // 5:
+		if next_vertex < min_vertex:
 			if verbose == True:	
-				print("error_generate:", next_vertex, "<", (bound * 2 + 1) ** 2 // 5)
+				print("error_generate:", next_vertex, "<", min_vertex)
 			return False
 		self._compute_end()
 		# check that it is possible to arrive to the end from any position
-		for u in self._vertices.keys():
-			flag = flag and self._check_link(u, self._end, verbose)
-		return flag
+		#	(in repair mode the missing links are added)
+		if repair:
+			return self._repair(location, bound, verbose)
+		return not(self._check_reaching(self._end, verbose))
 
 	def _compute_end(self, start = 0):
 		""" 
@@ -447,14 +713,14 @@ class map():
 		max_power = 3
 		for _ in range(num):
 			if white_list:
-				entity = random.choice(white_list)
+				entity = self._random.choice(white_list)
 				white_list.remove(entity)
 				for neighbour in self.neighbours(entity):
 					if neighbour in white_list: white_list.remove(neighbour)
 			else:
-				entity = random.choice(full_list)
+				entity = self._random.choice(full_list)
 			full_list.remove(entity)
-			power = random.randint(1, max_power)
+			power = self._random.randint(1, max_power)
 			self._entities[entity] = power
 
 	def _dijkstra(self, start, end, blacklist = []):
@@ -466,120 +732,759 @@ class map():
 			Dijkstra algorithm implemented with heaps. It is also possible to add a 
 			blacklist containing the vertices that we want to avoid 
 			(note that neither start or end should be blacklisted).
+			The heap stores only (distance, node): the path is rebuilt from the
+			predecessors once end is reached. The distances and predecessors lists
+			are allocated once per map (m._dijkstra_buffers) and only the touched 
+			entries are reset at the end of each call.
 		syntax:
 			distance, path = m._dijkstra(start, end)
 		"""
 		n = len(self._vertices)
-		distances = np.ones(n) * np.inf
-		heap = [(0, start, ())]
+		if self._dijkstra_buffers is None or len(self._dijkstra_buffers[0]) != n:
+			self._dijkstra_buffers = ([np.inf] * n, [-1] * n)
+		distances, previous = self._dijkstra_buffers
+		# touched: vertices whose distance has been updated (to be reset)
+		touched = []
+		heap = [(0, start)]
+		previous[start] = -1
 		# seen = set() # normal dijkstra
 		seen = set(blacklist) # blacklisted vertices are avoided
+		result = (np.inf, [])
 		while heap:
-			dist, node, path = heappop(heap)
+			dist, node = heappop(heap)
 			if node not in seen:	
 				seen.add(node)
-				path = path + (node, )
 				if node == end:
-					return dist, list(path)
+					path = [node]
+					while node != start:
+						node = previous[node]
+						path.append(node)
+					path.reverse()
+					result = (dist, path)
+					break
 				for neighbour, weight in self._vertices[node].items():
 					if neighbour not in seen:
 						new_dist = dist + weight
 						if new_dist < distances[neighbour]:
 							distances[neighbour] = new_dist
-							heappush(heap, (new_dist, neighbour, path))
-		# if it is impossible to find a path from start to end
-		return np.inf, []
+							previous[neighbour] = node
+							touched.append(neighbour)
+							heappush(heap, (new_dist, neighbour))
+		for node in touched:
+			distances[node] = np.inf
+		# if it is impossible to find a path from start to end the result is (np.inf, [])
+		return result
 	
-	def _compute_stamina_life(self, verbose = False):
+	def _astar(self, start, end, blacklist = []):
+		"""
+		description:
+			A* variant of m._dijkstra (same blacklist support and output).
+			The weight of each edge equals its step along one of the eight 
+			directions of m._generate, hence the Chebyshev distance between the
+			coordinates of a vertex and of end is an admissible and consistent 
+			heuristic: the cost is the same of m._dijkstra, with fewer expanded 
+			vertices (among paths with the same cost a different one could be returned).
+		syntax:
+			distance, path = m._astar(start, end)
+		"""
+		n = len(self._vertices)
+		if self._dijkstra_buffers is None or len(self._dijkstra_buffers[0]) != n:
+			self._dijkstra_buffers = ([np.inf] * n, [-1] * n)
+		distances, previous = self._dijkstra_buffers
+		end_x, end_y = self._coordinates[end]
+		touched = []
+		# heap entries: (distance + heuristic, distance, node)
+		heap = [(0, 0, start)]
+		previous[start] = -1
+		seen = set(blacklist) # blacklisted vertices are avoided
+		result = (np.inf, [])
+		while heap:
+			_, dist, node = heappop(heap)
+			if node not in seen:	
+				seen.add(node)
+				if node == end:
+					path = [node]
+					while node != start:
+						node = previous[node]
+						path.append(node)
+					path.reverse()
+					result = (dist, path)
+					break
+				for neighbour, weight in self._vertices[node].items():
+					if neighbour not in seen:
+						new_dist = dist + weight
+						if new_dist < distances[neighbour]:
+							distances[neighbour] = new_dist
+							previous[neighbour] = node
+							touched.append(neighbour)
+							x, y = self._coordinates[neighbour]
+							heappush(heap, (new_dist + max(abs(x - end_x), abs(y - end_y)), new_dist, neighbour))
+		for node in touched:
+			distances[node] = np.inf
+		# if it is impossible to find a path from start to end the result is (np.inf, [])
+		return result
+
+	def _shortest_path(self, start, end, blacklist = [], search = "dijkstra"):
+		"""
+		description:
+			Shortest path from start to end avoiding the blacklist, computed with
+			m._dijkstra (search = "dijkstra") or m._astar (search = "astar").
+		syntax:
+			distance, path = m._shortest_path(start, end, search = "astar")
+		"""
+		if search == "dijkstra":
+			return self._dijkstra(start, end, blacklist)
+		if search == "astar":
+			return self._astar(start, end, blacklist)
+		raise ValueError("unknown search: " + str(search))
+
+	def _adjacency_matrix(self):
+		""" 
+		description:
+			Return the weighted adjacency matrix of the graph (scipy.sparse csr_matrix).
+		syntax:
+			adjacency = m._adjacency_matrix()
+		"""
+		n = len(self._vertices)
+		edges = np.array(self.get_edges(), dtype = np.int64).reshape(-1, 3)
+		return sparse.csr_matrix((edges[:, 2], (edges[:, 0], edges[:, 1])), shape = (n, n))
+
+	def _unrestricted_pairs(self, sources, targets):
+		""" 
+		description:
+			Compute the shortest paths (without blacklist) from each vertex in sources
+			to each vertex in targets with a single multi-source call to 
+			scipy.sparse.csgraph.dijkstra; the paths are recovered from the predecessors matrix.
+			Returns a dictionary (source, target) -> (cost, shortest_path), where the cost is 
+			np.inf and the path is empty if target cannot be reached.
+		syntax:
+			pairs = m._unrestricted_pairs(sources, targets)
+		"""
+		distances, predecessors = csgraph.dijkstra(self._adjacency_matrix(), indices = sources, return_predecessors = True)
+		pairs = {}
+		for i in range(len(sources)):
+			for target in targets:
+				if not(np.isfinite(distances[i, target])):
+					pairs[(sources[i], target)] = (np.inf, [])
+					continue
+				path = [target]
+				node = target
+				while node != sources[i]:
+					node = int(predecessors[i, node])
+					path.append(node)
+				path.reverse()
+				pairs[(sources[i], target)] = (int(distances[i, target]), path)
+		return pairs
+
+	def _edge_arrays(self):
+		""" 
+		description:
+			Return (n, sources, targets, weights): the number of vertices and the arrays 
+			of the edges sorted by target (the input of m._batched_shortest_paths, 
+			to be built once per solve).
+		syntax:
+			edges = m._edge_arrays()
+		"""
+		adjacency = self._adjacency_matrix().tocoo()
+		order = np.argsort(adjacency.col, kind = "stable")
+		return adjacency.shape[0], adjacency.row[order], adjacency.col[order], adjacency.data[order].astype(float)
+
+	def _batched_shortest_paths(self, queries, vertices, edges = None, paths = True):
+		""" 
+		description:
+			Compute the shortest paths of a whole batch of queries (start, end, mask) at once,
+			where mask is a blacklist bitmask over the list vertices (bit i corresponds to 
+			vertices[i]). For each distinct couple (start, mask) a copy of the graph without
+			the edges touching the blacklisted vertices is built; the copies are disjoint blocks 
+			of a single sparse matrix, so one call of scipy.sparse.csgraph.dijkstra (min_only, 
+			one source for each block) solves all the couples together.
+			edges is the output of m._edge_arrays (computed if None).
+			Returns a dictionary (start, end, mask) -> (cost, shortest_path) (same output 
+			of m._dijkstra, among paths with the same cost a different one could be returned);
+			if paths is False the shortest_path is not rebuilt and it is None
+			(an empty list if end cannot be reached).
+		syntax:
+			paths = m._batched_shortest_paths(queries, vertices, edges)
+		"""
+		if edges is None:
+			edges = self._edge_arrays()
+		n, sources, targets, weights = edges
+		# rows: index of each distinct couple (start, mask), i.e. of each block
+		rows = {}
+		for start, _, mask in queries:
+			if (start, mask) not in rows:
+				rows[(start, mask)] = len(rows)
+		starts = np.array([start for start, _ in rows], dtype = np.int64)
+		masks = np.array([mask for _, mask in rows], dtype = np.int64)
+		blocked = np.zeros((len(rows), n), dtype = bool)
+		for i in range(len(vertices)):
+			blocked[:, vertices[i]] = (masks >> i) & 1 == 1
+		# block_rows, block_edges: the edges kept in each block (vertex v of block r is r * n + v)
+		block_rows, block_edges = np.nonzero(np.logical_not(blocked[:, sources] | blocked[:, targets]))
+		graph = sparse.csr_matrix((weights[block_edges], (block_rows * n + sources[block_edges], block_rows * n + targets[block_edges])),
+			shape = (len(rows) * n, len(rows) * n))
+		distances, predecessors, _ = csgraph.dijkstra(graph, indices = np.arange(len(rows)) * n + starts, min_only = True, 
+			return_predecessors = True)
+		costs = distances[[rows[(start, mask)] * n + end for start, end, mask in queries]].tolist()
+		shortest_paths = {}
+		for (start, end, mask), cost in zip(queries, costs):
+			if cost == np.inf:
+				shortest_paths[(start, end, mask)] = (np.inf, [])
+			elif not(paths):
+				shortest_paths[(start, end, mask)] = (int(cost), None)
+			else:
+				offset = rows[(start, mask)] * n
+				path = [end]
+				node = offset + end
+				while node != offset + start:
+					node = int(predecessors[node])
+					path.append(node - offset)
+				path.reverse()
+				shortest_paths[(start, end, mask)] = (int(cost), path)
+		return shortest_paths
+
+	def _compute_stamina_life(self, verbose = False, engine = "permutations", search = "dijkstra", precompute = "dijkstra",
+			workers = 1, first = None):
 		""" 
 		description:
 			Create a dictionary that stores, for each possible life cost,
 			the best stamina cost and its associated path. 
+			Available engines:
+				- "permutations": enumeration of all the ordered subsets of the entities;
+				- "dp": dynamic programming over (last entity, visited entities), 
+					see m._compute_stamina_life_dp;
+				- "pareto": label-setting search over (vertex, defeated entities),
+					see m._compute_stamina_life_pareto.
+			The shortest paths are computed with search = "dijkstra" or "astar" 
+			(see m._shortest_path); the engine "dp" also accepts search = "batched"
+			(see m._compute_stamina_life_dp), the engine "pareto" ignores search.
+			If precompute = "csgraph" the shortest paths without blacklist of the 
+			enumeration are computed at once (see m._unrestricted_pairs).
+			In the enumeration:
+				- first (list of indices of entities) restricts the search to the permutations
+					starting with one of them (the empty permutation is always considered);
+				- if workers > 1 the search is split by first entity across a process pool,
+					each worker gets a read-only snapshot of the map (see m.freeze) and the
+					best entries are merged at the end (see m._merge_stamina_life).
 		syntax:
 			m._compute_stamina_life()
 		"""
+		if engine == "dp":
+			return self._compute_stamina_life_dp(verbose, search)
+		if engine == "pareto":
+			return self._compute_stamina_life_pareto(verbose)
+		if engine != "permutations":
+			raise ValueError("unknown engine: " + str(engine))
+		if search == "batched":
+			raise ValueError("search = \"batched\" is only available with engine = \"dp\"")
+		if workers > 1:
+			# (a frozen map is already a read-only snapshot, it is only copied)
+			frozen = self.freeze() if isinstance(self, map) else copy.copy(self)
+			frozen._stamina_life = {}
+			# chunks: first entities assigned to each worker (at least one chunk, for the empty permutation)
+			chunks = [list(range(len(self._entities)))[i::workers] for i in range(workers)]
+			chunks = [chunk for chunk in chunks if chunk] or [[]]
+			with ProcessPoolExecutor(max_workers = workers) as executor:
+				results = list(executor.map(_compute_stamina_life_branch, [(frozen, chunk, search, precompute) for chunk in chunks]))
+			for stamina_life, _ in results:
+				self._merge_stamina_life(stamina_life)
+			if verbose: return tuple(sum(counts[i] for _, counts in results) for i in range(3))
+			else: return
 		# entities: list of labels of nodes where the entities are located
 		# full_list: entities + start + end
 		entities = list(self._entities.keys())
 		full_list = entities + [0, self._end]
+		# bits: dictionary which associates each entity (and the end) with a bit of the blacklist masks
+		bits = {}
+		for i in range(len(entities)):
+			bits[entities[i]] = 1 << i
+		bits[self._end] = 1 << len(entities)
 		# pairs: 
-		# 	- dictionary containing the shortest path which avoids the nodes in the tuple blacklist 
-		#		and its cost (tuple (cost, shortest_path)) for all couples in full_list;
-		#	- the keys are triples of type tuple (node_1, node_2, blacklist);
-		#	- we precompute pairs[(node_1, node_2, ())] for all couples (node_1, node_2);
-		# pairs_alias:
-		#	- dictionary which associates a triple (node_1, node_2, blacklist) with an already 
-		#		precomputed touple (cost, shortest_path);
-		# 	- the association is made following this assertion: 
-		#		if we merge the blackist list and a generic subset of the entities which are not blacklisted nor in the path 
-		# 		then we obtain a new blacklist which still leads to the same shortest path
+		# 	- dictionary containing, for each couple (node_1, node_2) of full_list, the list of the computed
+		#		shortest paths (see m._cache_path and m._cached_path);
+		#	- we precompute the shortest paths without blacklist for all couples (node_1, node_2);
+		#	- a stored shortest path computed with blacklist mask B_0 is still a shortest path 
+		#		for any blacklist mask B which contains B_0 and does not intersect the path
 		# (note: actually some couples are excluded from pairs because they are not useful:
 		# 	- from any node to itself
 		#	- from end to any node
 		#	- from any node to start )
 		pairs = {}
-		pairs_alias = {}
 		# verbose mode
 		if verbose: n_precomputations, n_computations, n_greedy = 0, 0, 0
+		if precompute == "csgraph":
+			unrestricted = self._unrestricted_pairs([node for node in full_list if node != self._end], 
+				[node for node in full_list if node != 0])
 		for node_1 in full_list:
 			for node_2 in full_list:
 				if (node_1 != node_2) and (node_1 != self._end) and (node_2 != 0):
 					if verbose: n_precomputations += 1
-					pairs[(node_1, node_2, ())] = self._dijkstra(node_1, node_2)
-					for alias in powerset(set(entities) - set(pairs[(node_1, node_2, ())][1])):
-						pairs_alias[(node_1, node_2, alias)] = (node_1, node_2, ())
-		for k in range(len(entities) + 1):
-			for permutation in itertools.permutations(entities, k):
-				# permutation: ordered subset of the entities' set.
-				#	we are looking for the shortest path that crosses these and only these entities, with order,
-				#	starting from start and ending in end
-				# flag: if the path we are considering is possible than True
-				#	else False				
-				flag = True
-				# life/stamina: variable containing the life/stamina consumed while traversing the path
-				life = 0
-				stamina = 0
-				# path: list containing the shortest path associated with the current permutation
-				path = []
-				full_permutation = [0] + list(permutation) + [self._end]
-				# at each step we look for the shortest path between node_1 and node_2 such that does not cross
-				#	the entities which are still "active" (stored in the blacklist variable)
-				blacklist = entities.copy() + [self._end]
-				for i in range(len(full_permutation) - 1):
-					node_1 = full_permutation[i]
-					node_2 = full_permutation[i + 1]
-					blacklist.remove(node_2)
-					# if we haven't got the shortest path for the triple (node_1, node_2, blacklist) we compute it and store it
-					#	(we also update pairs_alias)
-					if verbose: n_greedy += 1
-					if (node_1, node_2, tuple(blacklist)) not in pairs_alias:
-						if verbose: n_computations += 1
-						pairs[(node_1, node_2, tuple(blacklist))] = self._dijkstra(node_1, node_2, blacklist)
-						current_cost, current_path = pairs[(node_1, node_2, tuple(blacklist))]
-						for alias in powerset(set(entities) - set(pairs[(node_1, node_2, tuple(blacklist))][1]) - set(blacklist)):
-							pairs_alias[(node_1, node_2, tuple(list(alias) + blacklist))] = (node_1, node_2, tuple(blacklist))
-					# else we use the stored one
-					else:
-						current_cost, current_path = pairs[pairs_alias[(node_1, node_2, tuple(blacklist))]]
-					if np.isfinite(current_cost): 
-						if i != 0:
-							life += self._entities[node_1]
-							path += current_path[1:]
-						else:
-							path += current_path
-						stamina += current_cost
+					if precompute == "csgraph":
+						self._cache_path(pairs, node_1, node_2, 0, unrestricted[(node_1, node_2)], bits)
 					else:
-						flag = False
-						break
-				if flag:
-					# if the optimal path corresponding to the permutation costs less than the best path we found with the same life cost (life)
-					#	we save in self._stamina_life[life] its stamina cost (stamina) and the path
-					if (life not in self._stamina_life) or ((life in self._stamina_life) and (stamina < self._stamina_life[life][0])):
-						self._stamina_life[life] = (stamina, path)
+						self._cache_path(pairs, node_1, node_2, 0, self._shortest_path(node_1, node_2, search = search), bits)
+		# the ordered subsets of the entities are enumerated through a depth-first search, where each node
+		#	of the search tree is a prefix (order: tuple of the indices of the visited entities) and carries
+		#	its stamina, life, path and blacklist_mask (the entities which are still "active" and the end):
+		#	the prefixes shared by several permutations are computed once
+		# lower_bound: cost of the shortest path without blacklist from each node to the end
+		lower_bound = {}
+		for node in entities + [0]:
+			lower_bound[node] = self._cached_path(pairs, node, self._end, 0)[0]
+		# ties: for each life, (number of entities, order) of the stored path; ties are broken as in the
+		#	enumeration by increasing number of entities and lexicographic order (the entries already stored,
+		#	e.g. by a previous call, another engine or the cache, are compared with the same key)
+		ties = {}
+		for life in self._stamina_life:
+			ties[life] = self._tie_key(self._stamina_life[life])[1:]
+		stack = [((), 0, 0, [0], (1 << (len(entities) + 1)) - 1)]
+		while stack:
+			order, stamina, life, path, blacklist_mask = stack.pop()
+			node_1 = path[-1]
+			# pruning: the branch is discarded if, for every life reachable from the prefix (life plus the
+			#	power of any subset of the remaining entities), its stamina plus the lower bound to the end
+			#	is worse than the stored one (reachable lives are encoded as bits of an integer)
+			reachable = 1 << life
+			for i in range(len(entities)):
+				if blacklist_mask >> i & 1:
+					reachable |= reachable << self._entities[entities[i]]
+			if all((reachable >> l & 1) == 0 or (l in self._stamina_life and self._stamina_life[l][0] < stamina + lower_bound[node_1])
+					for l in range(reachable.bit_length())):
+				continue
+			# closing leg towards the end
+			if verbose: n_greedy += 1
+			current_cost, current_path = self._blacklisted_path(pairs, node_1, self._end, blacklist_mask & ~bits[self._end], bits, search)
+			if np.isfinite(current_cost):
+				# if the optimal path corresponding to the permutation costs less than the best path we found with the same life cost (life)
+				#	we save in self._stamina_life[life] its stamina cost (stamina) and the path
+				if (life not in self._stamina_life) or (stamina + current_cost, len(order), order) < (self._stamina_life[life][0], ) + ties[life]:
+					self._stamina_life[life] = (stamina + current_cost, path + current_path[1:])
+					ties[life] = (len(order), order)
+			# extensions of the prefix (pushed in reverse order, so that they are visited in lexicographic order)
+			for j in reversed(range(len(entities))):
+				if not(blacklist_mask >> j & 1) or (not(order) and first is not None and j not in first):
+					continue
+				node_2 = entities[j]
+				if verbose: n_greedy += 1
+				current_cost, current_path = self._blacklisted_path(pairs, node_1, node_2, blacklist_mask & ~bits[node_2], bits, search)
+				# if the leg is impossible then every permutation with this prefix is impossible
+				if np.isfinite(current_cost):
+					stack.append((order + (j, ), stamina + current_cost, life + self._entities[node_2], path + current_path[1:], 
+						blacklist_mask & ~bits[node_2]))
+		if verbose: n_computations = sum(len(computed) for computed in pairs.values()) - n_precomputations
 		if verbose: return n_precomputations, n_computations, n_greedy
 		else: return
 
-	def load(self, filename):
+	def _merge_stamina_life(self, stamina_life):
+		""" 
+		description:
+			Merge a dictionary life -> (stamina, path) into m._stamina_life keeping, for each life,
+			the best entry with the same tie-breaking of the enumeration (lower stamina, then fewer
+			entities, then lexicographic order of the entities, which are visited by the path in
+			the order of their first appearance).
+		syntax:
+			m._merge_stamina_life(stamina_life)
+		"""
+		for life, entry in stamina_life.items():
+			if (life not in self._stamina_life) or (self._tie_key(entry) < self._tie_key(self._stamina_life[life])):
+				self._stamina_life[life] = entry
+
+	def _tie_key(self, entry):
+		""" 
+		description:
+			Return the key (stamina, number of entities, order) of an entry (stamina, path) of
+			m._stamina_life, where order is the tuple of the indices of the entities 
+			in the order of their first appearance in the path.
+		syntax:
+			key = m._tie_key(entry)
+		"""
+		entities = list(self._entities.keys())
+		order = []
+		for v in entry[1]:
+			if v in self._entities and entities.index(v) not in order:
+				order.append(entities.index(v))
+		return (entry[0], len(order), tuple(order))
+
+	def _cache_path(self, pairs, node_1, node_2, blacklist_mask, result, bits):
+		""" 
+		description:
+			Store in the dictionary pairs the shortest path result = (cost, shortest_path) 
+			from node_1 to node_2 computed with the blacklist encoded by blacklist_mask, 
+			together with the bitmask of the vertices of bits (entities and end) crossed by it.
+			Each path is stored once: memory is linear in the number of computed paths.
+			Returns result.
+		syntax:
+			cost, path = m._cache_path(pairs, node_1, node_2, blacklist_mask, result, bits)
+		"""
+		path_mask = 0
+		for v in result[1]:
+			path_mask |= bits.get(v, 0)
+		pairs.setdefault((node_1, node_2), []).append((blacklist_mask, path_mask, result))
+		return result
+
+	def _blacklisted_path(self, pairs, node_1, node_2, blacklist_mask, bits, search = "dijkstra"):
+		""" 
+		description:
+			Return (cost, shortest_path) from node_1 to node_2 avoiding the vertices of bits 
+			in blacklist_mask: the stored path is used if valid (see m._cached_path),
+			otherwise it is computed with search (see m._shortest_path) and stored.
+		syntax:
+			cost, path = m._blacklisted_path(pairs, node_1, node_2, blacklist_mask, bits)
+		"""
+		cached = self._cached_path(pairs, node_1, node_2, blacklist_mask)
+		if cached is None:
+			blacklist = [v for v in bits if blacklist_mask & bits[v]]
+			cached = self._cache_path(pairs, node_1, node_2, blacklist_mask, self._shortest_path(node_1, node_2, blacklist, search), bits)
+		return cached
+
+	def _cached_path(self, pairs, node_1, node_2, blacklist_mask):
+		""" 
+		description:
+			Look for a shortest path from node_1 to node_2 stored in pairs (see m._cache_path)
+			which is still valid for the blacklist encoded by blacklist_mask, i.e. such that
+			it has been computed with a blacklist contained in the current one and it does not
+			cross the current blacklist. Returns (cost, shortest_path) or None.
+		syntax:
+			cached = m._cached_path(pairs, node_1, node_2, blacklist_mask)
+		"""
+		for computed_mask, path_mask, result in pairs.get((node_1, node_2), []):
+			if (blacklist_mask & path_mask) == 0 and (computed_mask & ~blacklist_mask) == 0:
+				return result
+		return None
+
+	def _leg(self, node_1, node_2, visited, entities, legs, search = "dijkstra"):
+		""" 
+		description:
+			Return (cost, shortest_path) from node_1 to node_2 avoiding the entities which
+			are not in the bitmask visited (over the list entities) and the end
+			(unless node_2 is the end), computed with search (see m._shortest_path).
+			The results are cached in the dictionary legs.
+		syntax:
+			cost, path = m._leg(node_1, node_2, visited, entities, legs)
+		"""
+		if (node_1, node_2, visited) not in legs:
+			blacklist = [entities[i] for i in range(len(entities)) if not(visited >> i & 1)]
+			if node_2 != self._end:
+				blacklist.append(self._end)
+			legs[(node_1, node_2, visited)] = self._shortest_path(node_1, node_2, blacklist, search)
+		return legs[(node_1, node_2, visited)]
+
+	def _prefetch_legs(self, queries, entities, legs, edges, paths = False):
+		""" 
+		description:
+			Compute with a single call of m._batched_shortest_paths the legs (node_1, node_2, visited)
+			in queries which are not yet in the dictionary legs (same blacklist of m._leg, 
+			encoded as a bitmask over entities + [end]). If paths is False only the costs are
+			computed (the stored path is None), otherwise also the paths of the stored legs
+			without path are computed.
+		syntax:
+			m._prefetch_legs(queries, entities, legs, edges)
+		"""
+		full_mask = (1 << len(entities)) - 1
+		end_bit = 1 << len(entities)
+		batch = {}
+		for node_1, node_2, visited in queries:
+			if ((node_1, node_2, visited) not in legs) or (paths and legs[(node_1, node_2, visited)][1] is None):
+				batch[(node_1, node_2, visited)] = (node_1, node_2, (full_mask & ~visited) | (end_bit if node_2 != self._end else 0))
+		if batch:
+			shortest_paths = self._batched_shortest_paths(list(batch.values()), entities + [self._end], edges, paths)
+			for leg, query in batch.items():
+				legs[leg] = shortest_paths[query]
+
+	def _compute_stamina_life_dp(self, verbose = False, search = "dijkstra"):
+		""" 
+		description:
+			Held-Karp style version of m._compute_stamina_life: the best stamina cost
+			of the paths from start visiting a given set of entities (bitmask over the
+			list of entities) and ending in a given entity is computed by dynamic 
+			programming, with the same blacklist semantics (the entities not yet
+			visited and the end cannot be crossed). The cost is O(2^E * E^2) legs
+			instead of the enumeration of all the ordered subsets.
+			Ties are broken as in the enumeration (fewer entities first, then the
+			lexicographic order of the entities), hence the stamina costs are the same;
+			among paths with the same cost a different one could be returned.
+			If search = "batched" the legs are computed layer by layer (number of visited
+			entities) with one call of m._batched_shortest_paths for all the legs leaving
+			the states of the layer (see m._prefetch_legs).
+		syntax:
+			m._compute_stamina_life(engine = "dp")
+		"""
+		entities = list(self._entities.keys())
+		n = len(entities)
+		full_mask = (1 << n) - 1
+		# legs: dictionary (node_1, node_2, visited) -> (cost, shortest_path), where the shortest path
+		#	avoids the entities which are not in the bitmask visited (and the end if node_2 is not the end)
+		legs = {}
+		# edges: arrays of the edges for m._batched_shortest_paths (built once per solve)
+		if search == "batched":
+			edges = self._edge_arrays()
+			self._prefetch_legs([(0, entities[j], 1 << j) for j in range(n)], entities, legs, edges)
+		# verbose mode
+		if verbose: n_greedy = 0
+		# best: dictionary (visited, last) -> (stamina, order), where order is the tuple of the indices
+		#	of the visited entities (the lexicographically smallest one in case of ties)
+		best = {}
+		for j in range(n):
+			if verbose: n_greedy += 1
+			cost = self._leg(0, entities[j], 1 << j, entities, legs, search)[0]
+			if np.isfinite(cost):
+				best[(1 << j, j)] = (cost, (j, ))
+		# the bitmasks are processed by increasing number of entities since each transition adds an entity
+		layers = [[] for _ in range(n + 1)]
+		for visited in range(1, full_mask + 1):
+			layers[bin(visited).count("1")].append(visited)
+		for size in range(1, n + 1):
+			if search == "batched":
+				# all the legs leaving the states of the layer are computed together
+				self._prefetch_legs([(entities[last], entities[j], visited | (1 << j)) for (visited, last) in best 
+					if bin(visited).count("1") == size for j in range(n) if not(visited >> j & 1)], entities, legs, edges)
+			for visited in layers[size]:
+				for last in range(n):
+					if (visited, last) not in best:
+						continue
+					stamina, order = best[(visited, last)]
+					for j in range(n):
+						if visited >> j & 1:
+							continue
+						if verbose: n_greedy += 1
+						cost = self._leg(entities[last], entities[j], visited | (1 << j), entities, legs, search)[0]
+						if not(np.isfinite(cost)):
+							continue
+						candidate = (stamina + cost, order + (j, ))
+						if ((visited | (1 << j), j) not in best) or (candidate < best[(visited | (1 << j), j)]):
+							best[(visited | (1 << j), j)] = candidate
+		# closing leg towards the end, for each life cost keep the best (stamina, number of entities, order)
+		closing = {}
+		if search == "batched":
+			self._prefetch_legs([(0, self._end, 0)] + [(entities[last], self._end, visited) for (visited, last) in best], 
+				entities, legs, edges)
+		if verbose: n_greedy += 1
+		cost = self._leg(0, self._end, 0, entities, legs, search)[0]
+		if np.isfinite(cost):
+			closing[0] = (cost, 0, ())
+		for (visited, last), (stamina, order) in best.items():
+			if verbose: n_greedy += 1
+			cost = self._leg(entities[last], self._end, visited, entities, legs, search)[0]
+			if not(np.isfinite(cost)):
+				continue
+			life = 0
+			for i in order:
+				life += self._entities[entities[i]]
+			candidate = (stamina + cost, len(order), order)
+			if (life not in closing) or (candidate < closing[life]):
+				closing[life] = candidate
+		# rebuild the paths
+		if search == "batched":
+			rebuild = []
+			for _, _, order in closing.values():
+				full_permutation = [0] + [entities[i] for i in order] + [self._end]
+				visited = 0
+				for i in range(len(full_permutation) - 1):
+					if i < len(order):
+						visited |= 1 << order[i]
+					rebuild.append((full_permutation[i], full_permutation[i + 1], visited))
+			self._prefetch_legs(rebuild, entities, legs, edges, paths = True)
+		for life, (stamina, _, order) in closing.items():
+			full_permutation = [0] + [entities[i] for i in order] + [self._end]
+			path = [0]
+			visited = 0
+			for i in range(len(full_permutation) - 1):
+				if i < len(order):
+					visited |= 1 << order[i]
+				path += self._leg(full_permutation[i], full_permutation[i + 1], visited, entities, legs, search)[1][1:]
+			self._stamina_life[life] = (stamina, path)
+		if verbose: return 0, len(legs), n_greedy
+		else: return
+
+	def _achievable_lives(self):
+		""" 
+		description:
+			Return the sorted list of the life costs of all the possible paths from start
+			to end, through a BFS visit over the states (vertex, defeated entities)
+			(the defeated entities are a bitmask over the list of entities and the end
+			can be reached only as last vertex). The list is computed at the first call
+			and stored in m._lives.
+		syntax:
+			lives = m._achievable_lives()
+		"""
+		if self._lives is not None:
+			return list(self._lives)
+		entities = list(self._entities.keys())
+		bits = {}
+		for i in range(len(entities)):
+			bits[entities[i]] = 1 << i
+		explored = {(0, 0)}
+		queue = [(0, 0)]
+		lives = set()
+		for v, defeated in queue:
+			if v == self._end:
+				lives.add(self._life_from_mask(defeated, entities))
+				continue
+			for _, u, _ in self.starting_edges(v):
+				if (u, defeated | bits.get(u, 0)) not in explored:
+					explored.add((u, defeated | bits.get(u, 0)))
+					queue.append((u, defeated | bits.get(u, 0)))
+		self._lives = sorted(lives)
+		return list(self._lives)
+
+	def _extreme_life(self, maximum = False):
+		""" 
+		description:
+			Return the minimum (or maximum) life cost of the paths from start to end 
+			(None if the end cannot be reached) without enumerating all the achievable ones:
+				- minimum: Dijkstra over the vertices where entering an entity costs its power
+					(an optimal path is simple, so each entity is counted once);
+				- maximum: a path can visit all the vertices of a strongly connected component
+					(of the graph without the end, which can be reached only as last vertex) 
+					before leaving it, hence the maximum life is the heaviest path, weighted by
+					the power of the components, in the DAG of the components from the one of 
+					start to one with an edge to the end.
+		syntax:
+			life = m._extreme_life(maximum = False)
+		"""
+		if self._lives is not None:
+			if not(self._lives):
+				return None
+			return self._lives[-1] if maximum else self._lives[0]
+		if not(maximum):
+			distances = {0: 0}
+			heap = [(0, 0)]
+			while heap:
+				life, v = heappop(heap)
+				if life > distances[v]:
+					continue
+				if v == self._end:
+					return life
+				for _, u, _ in self.starting_edges(v):
+					if life + self._entities.get(u, 0) < distances.get(u, np.inf):
+						distances[u] = life + self._entities.get(u, 0)
+						heappush(heap, (distances[u], u))
+			return None
+		n = len(self.get_vertices())
+		edges = [(u, v) for u, v, _ in self.get_edges() if u != self._end and v != self._end]
+		graph = sparse.csr_matrix((np.ones(len(edges)), ([u for u, _ in edges], [v for _, v in edges])), shape = (n, n))
+		_, labels = csgraph.connected_components(graph, directed = True, connection = "strong")
+		labels = labels.tolist()
+		# power, successors, exits: power of the entities, following components and edge to the end of each component
+		power, successors, exits = {}, {}, set()
+		for v in range(n):
+			if v != self._end:
+				power[labels[v]] = power.get(labels[v], 0) + self._entities.get(v, 0)
+				successors.setdefault(labels[v], set())
+		for u, v, _ in self.get_edges():
+			if v == self._end and u != self._end:
+				exits.add(labels[u])
+			elif u != self._end and v != self._end and labels[u] != labels[v]:
+				successors[labels[u]].add(labels[v])
+		# best: maximum life from each component to the end (computed in postorder, None if the end cannot be reached)
+		best = {}
+		stack = [(labels[0], iter(successors[labels[0]]))]
+		while stack:
+			component, following = stack[-1]
+			for next_component in following:
+				if next_component not in best:
+					stack.append((next_component, iter(successors[next_component])))
+					break
+			else:
+				stack.pop()
+				lives = [best[c] for c in successors[component] if best[c] is not None]
+				if component in exits:
+					lives.append(0)
+				best[component] = power[component] + max(lives) if lives else None
+		return best[labels[0]]
+
+	def _life_from_mask(self, defeated, entities):
+		""" 
+		description:
+			Return the life cost of the entities in the bitmask defeated (over the list entities).
+		syntax:
+			life = m._life_from_mask(defeated, entities)
+		"""
+		life = 0
+		for i in range(len(entities)):
+			if defeated >> i & 1:
+				life += self._entities[entities[i]]
+		return life
+
+	def _label_search(self, target_life = None, dominance = None):
+		""" 
+		description:
+			Label-setting search (Dijkstra over the stamina) on the states (vertex, defeated entities):
+			entering an entity defeats it and the end can be reached only as last vertex, which 
+			is the same blacklist semantics of m._compute_stamina_life. Since the labels are
+			settled by increasing stamina, the first label reaching the end with a given life 
+			cost is the best one. Returns a dictionary life -> (stamina, path).
+			If target_life is given, the labels with a higher life cost are discarded and 
+			the search stops at the first label reaching the end with life target_life.
+			dominance allows to discard the labels dominated in (life, stamina) by a settled
+			label at the same vertex, it is sound only for the extreme life costs:
+				- "subset" (minimum life): a settled label with a subset of the defeated entities;
+				- "superset" (maximum life): a settled label with a superset of the defeated entities.
+		syntax:
+			stamina_life = m._label_search()
+		"""
+		entities = list(self._entities.keys())
+		bits = {}
+		for i in range(len(entities)):
+			bits[entities[i]] = 1 << i
+		# settled: dictionary vertex -> list of the settled defeated masks
+		settled = {}
+		# distances/previous: best stamina and predecessor state of each (vertex, defeated)
+		distances = {(0, 0): 0}
+		previous = {(0, 0): None}
+		heap = [(0, 0, 0)]
+		stamina_life = {}
+		while heap:
+			stamina, v, defeated = heappop(heap)
+			masks = settled.setdefault(v, [])
+			if defeated in masks:
+				continue
+			if dominance == "subset" and any((mask & defeated) == mask for mask in masks):
+				continue
+			if dominance == "superset" and any((mask & defeated) == defeated for mask in masks):
+				continue
+			masks.append(defeated)
+			life = self._life_from_mask(defeated, entities)
+			if v == self._end:
+				if (target_life is None and life not in stamina_life) or (life == target_life):
+					path = []
+					state = (v, defeated)
+					while state is not None:
+						path.append(state[0])
+						state = previous[state]
+					path.reverse()
+					stamina_life[life] = (stamina, path)
+					if life == target_life:
+						break
+				continue
+			for _, u, weight in self.starting_edges(v):
+				state = (u, defeated | bits.get(u, 0))
+				if target_life is not None and u in bits and not(defeated & bits[u]) and life + self._entities[u] > target_life:
+					continue
+				if stamina + weight < distances.get(state, np.inf):
+					distances[state] = stamina + weight
+					previous[state] = (v, defeated)
+					heappush(heap, (stamina + weight, state[0], state[1]))
+		return stamina_life
+
+	def _compute_stamina_life_pareto(self, verbose = False):
+		""" 
+		description:
+			Version of m._compute_stamina_life based on a multi-criteria label-setting 
+			search over (vertex, defeated entities) (see m._label_search): the number of 
+			states is V * 2^E instead of the enumeration of the ordered subsets of the entities.
+			The stamina costs are the same of the enumeration (among paths with the same 
+			cost a different one could be returned).
+			No shortest path is precomputed nor computed, hence if verbose is True the 
+			returned counts are (0, 0, number of stored entries).
+		syntax:
+			m._compute_stamina_life(engine = "pareto")
+		"""
+		self._stamina_life.update(self._label_search())
+		if verbose: return 0, 0, len(self._stamina_life)
+		else: return
+
+	def load(self, filename, cache_dir = None, max_size = 2 ** 28):
 		""" 
 		description:
 			Load the map from a source file (filename), correctly formatted, i.e. 
@@ -589,11 +1494,25 @@ class map():
 				3. one line per edge composed as follows: (u v weight);
 				4. a vertex id corresponding to the end of the map;
 				5. one line per entity containing id and power.
+			The dictionary m._stamina_life is computed lazily (see m.get_parameters),
+			unless cache_dir is given: in that case it is read from (or computed and
+			stored in) the solver cache (see m._cached_stamina_life).
 		syntax:
 			m.load(filename)
 		"""
 		with open(filename, "r") as file:
 			lines = file.readlines()
+		self._parse(lines)
+		if cache_dir is not None:
+			self._cached_stamina_life(cache_dir, max_size)
+
+	def _parse(self, lines):
+		""" 
+		description:
+			Fill the map from the lines of a .map file (see m.load).
+		syntax:
+			m._parse(lines)
+		"""
 		flag = 1
 		for i in range(len(lines)):
 			if lines[i] == "\n":
@@ -617,7 +1536,6 @@ class map():
 				entity = lines[i].split()
 				v, power = entity[:2]		
 				self._entities[int(v)] = int(power)
-		self._compute_stamina_life()
 		
 	def save(self, filename):
 		""" 
@@ -626,6 +1544,16 @@ class map():
 		syntax:
 			m.save(filename)
 		"""
+		with open(filename, "w") as file:
+			file.write(self._to_text())
+
+	def _to_text(self):
+		""" 
+		description:
+			Return the content of the .map file of the map (see m.load).
+		syntax:
+			lines = m._to_text()
+		"""
 		lines = str(self._size_parameter) + "\n\n"
 		for v in self._coordinates:
 			lines += str(v) + " " + str(self._coordinates[v][0]) + " " + str(self._coordinates[v][1]) + "\n"
@@ -637,8 +1565,100 @@ class map():
 		lines += str(self._end) + "\n\n"
 		for v in self._entities:
 			lines += str(v) + " " + str(self._entities[v]) + "\n"
-		with open(filename, "w") as file:
-			file.write(lines)
+		return lines
+
+	def _content_hash(self):
+		""" 
+		description:
+			Return a hash (hexadecimal string) of the canonical content of the map:
+			sorted vertices with coordinates, sorted edges, end and sorted entities.
+		syntax:
+			key = m._content_hash()
+		"""
+		content = (sorted(self._coordinates.items()), sorted(tuple(edge) for edge in self.get_edges()), 
+			self._end, sorted(self._entities.items()))
+		return hashlib.sha256(repr(content).encode()).hexdigest()
+
+	def get_pair_distances(self):
+		""" 
+		description:
+			Return the dictionary (node_1, node_2) -> cost of the shortest paths without
+			blacklist between all the couples of start, entities and end
+			(computed once, see m._unrestricted_pairs).
+		syntax:
+			pair_distances = m.get_pair_distances()
+		"""
+		if not(self._pair_distances):
+			nodes = [0] + list(self._entities.keys()) + [self._end]
+			for (node_1, node_2), (cost, _) in self._unrestricted_pairs(nodes, nodes).items():
+				self._pair_distances[(node_1, node_2)] = cost
+		return self._pair_distances
+
+	def _cached_stamina_life(self, cache_dir, max_size = 2 ** 28):
+		""" 
+		description:
+			Fill m._stamina_life and the pair distances (see m.get_pair_distances) from the
+			content-addressed solver cache in the directory cache_dir (one file per map, 
+			named after m._content_hash()). If the map is not in the cache (or its file
+			has a different cache_version) they are computed and stored.
+			The files are plain JSON (no code is executed when they are read).
+			The cache is bounded in size (max_size bytes): the least recently used files
+			are removed (each hit updates the modification time of its file).
+		syntax:
+			m._cached_stamina_life(cache_dir)
+		"""
+		os.makedirs(cache_dir, exist_ok = True)
+		filename = os.path.join(cache_dir, self._content_hash() + ".json")
+		try:
+			with open(filename, "r") as file:
+				content = json.load(file)
+			if content["version"] == cache_version:
+				self._stamina_life = {life: (stamina, path) for life, stamina, path in content["stamina_life"]}
+				self._pair_distances = {(node_1, node_2): cost for node_1, node_2, cost in content["pair_distances"]}
+				os.utime(filename)
+				return
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+		if not(self._stamina_life):
+			self._compute_stamina_life()
+		content = {
+			"version": cache_version,
+			"stamina_life": [[life, stamina, path] for life, (stamina, path) in self._stamina_life.items()],
+			"pair_distances": [[node_1, node_2, cost] for (node_1, node_2), cost in self.get_pair_distances().items()]
+		}
+		# write and rename, so that concurrent readers never see a partial file
+		with open(filename + "." + str(os.getpid()), "w") as file:
+			json.dump(content, file)
+		os.replace(filename + "." + str(os.getpid()), filename)
+		# least recently used eviction (the files removed in the meantime by 
+		#	concurrent processes are skipped)
+		files = []
+		for name in os.listdir(cache_dir):
+			if name.endswith(".json"):
+				try:
+					stat = os.stat(os.path.join(cache_dir, name))
+				except FileNotFoundError:
+					continue
+				files.append((stat.st_mtime, stat.st_size, name))
+		files.sort()
+		size = sum(file[1] for file in files)
+		for _, file_size, name in files:
+			if size <= max_size or name == os.path.basename(filename):
+				continue
+			try:
+				os.remove(os.path.join(cache_dir, name))
+			except FileNotFoundError:
+				pass
+			size -= file_size
+
+	def freeze(self):
+		""" 
+		description:
+			Return an immutable, array-backed view of the map (see frozen_map).
+		syntax:
+			fm = m.freeze()
+		"""
+		return frozen_map(self)
 
 	def draw(self,
 	  		filename = "", notebook = False,
@@ -883,4 +1903,385 @@ class map():
 				seed = seed, caption = caption, update = update, active_entities = active_entities, path = path,
 				font_size = font_size, node_size = node_size, min_target_margin = min_target_margin, figure_size = 5)
 			plt.show()
-			return None
\ No newline at end of file
+			return None
+
+class frozen_map():
+
+	def __init__(self, m):
+		"""
+		description:
+			Immutable, array-backed view of a map m (the vertices are supposed
+			to be labelled 0, ..., n - 1):
+				- _offsets, _targets, _weights: CSR representation of the edges 
+					(the edges starting from u are _targets[_offsets[u]:_offsets[u + 1]],
+					in the same order of m);
+				- _reverse_offsets, _sources: CSR representation of the reversed edges;
+				- _coordinates: int32 array of shape (n, 2);
+				- _powers: int32 array with the power of the entity located 
+					in each vertex (0 if there is none).
+			The arrays are read-only and the entities are stored in a read-only mapping
+			(fm.get_entities() returns a copy). The solver results (_stamina_life, 
+			_targeted_parameters, _lives) are not frozen: as in m they are caches filled
+			by fm.get_parameters() and fm._compute_stamina_life(). It exposes the same 
+			getters of m (hence it can be used by the solvers and by the functions in 
+			rl.py) and m.thaw() returns an equivalent map (e.g. for drawing).
+		syntax:
+			fm = frozen_map(m)
+		"""
+		n = len(m._vertices)
+		self._size_parameter = m._size_parameter
+		self._end = m._end
+		self._entities = MappingProxyType(dict(m._entities))
+		self._stamina_life = dict(m._stamina_life)
+		self._targeted_parameters = dict(m._targeted_parameters)
+		self._lives = m._lives
+		self._offsets = np.zeros(n + 1, dtype = np.int32)
+		for u in range(n):
+			self._offsets[u + 1] = self._offsets[u] + len(m._vertices[u])
+		self._targets = np.fromiter((v for u in range(n) for v in m._vertices[u]), dtype = np.int32, count = self._offsets[-1])
+		self._weights = np.fromiter((w for u in range(n) for w in m._vertices[u].values()), dtype = np.int32, count = self._offsets[-1])
+		order = np.argsort(self._targets, kind = "stable")
+		self._sources = np.repeat(np.arange(n, dtype = np.int32), np.diff(self._offsets))[order]
+		self._reverse_offsets = np.zeros(n + 1, dtype = np.int32)
+		self._reverse_offsets[1:] = np.cumsum(np.bincount(self._targets, minlength = n))
+		self._coordinates = np.array([m._coordinates[u] for u in range(n)], dtype = np.int32).reshape(n, 2)
+		self._powers = np.zeros(n, dtype = np.int32)
+		for v, power in self._entities.items():
+			self._powers[v] = power
+		for array in (self._offsets, self._targets, self._weights, self._sources, self._reverse_offsets, self._coordinates, self._powers):
+			array.flags.writeable = False
+		self._dijkstra_buffers = None
+
+	def __getstate__(self):
+		"""
+		description:
+			Return the state of the frozen map for pickle/copy (the read-only 
+			mapping of the entities cannot be pickled, hence it is replaced by a dict).
+		syntax:
+			state = fm.__getstate__()
+		"""
+		state = self.__dict__.copy()
+		state["_entities"] = dict(self._entities)
+		return state
+
+	def __setstate__(self, state):
+		"""
+		description:
+			Restore the state of the frozen map (see fm.__getstate__), 
+			with read-only arrays and entities.
+		syntax:
+			fm.__setstate__(state)
+		"""
+		self.__dict__.update(state)
+		self._entities = MappingProxyType(dict(state["_entities"]))
+		for array in (self._offsets, self._targets, self._weights, self._sources, self._reverse_offsets, self._coordinates, self._powers):
+			array.flags.writeable = False
+
+	# solvers shared with map (they only rely on _entities, _end, _stamina_life and _shortest_path)
+	get_parameters = map.get_parameters
+	_compute_targeted_parameters = map._compute_targeted_parameters
+	_shortest_path = map._shortest_path
+	_unrestricted_pairs = map._unrestricted_pairs
+	_cache_path = map._cache_path
+	_merge_stamina_life = map._merge_stamina_life
+	_tie_key = map._tie_key
+	_edge_arrays = map._edge_arrays
+	_batched_shortest_paths = map._batched_shortest_paths
+	_achievable_lives = map._achievable_lives
+	_extreme_life = map._extreme_life
+	_life_from_mask = map._life_from_mask
+	_label_search = map._label_search
+	_compute_stamina_life_pareto = map._compute_stamina_life_pareto
+	_cached_path = map._cached_path
+	_blacklisted_path = map._blacklisted_path
+	_leg = map._leg
+	_prefetch_legs = map._prefetch_legs
+	_compute_stamina_life = map._compute_stamina_life
+	_compute_stamina_life_dp = map._compute_stamina_life_dp
+
+	def _adjacency_matrix(self):
+		"""
+		description:
+			Return the weighted adjacency matrix of the graph (built directly from the CSR arrays).
+		syntax:
+			adjacency = fm._adjacency_matrix()
+		"""
+		n = len(self._powers)
+		return sparse.csr_matrix((self._weights, self._targets, self._offsets), shape = (n, n))
+
+	def thaw(self):
+		"""
+		description:
+			Return a (mutable) map equivalent to the frozen one.
+		syntax:
+			m = fm.thaw()
+		"""
+		m = map()
+		m._size_parameter = self._size_parameter
+		for v in range(len(self._powers)):
+			m._insert_vertex(v, self._coordinates[v])
+		for u, v, weight in self.get_edges():
+			m._insert_edge((u, v), weight)
+		m._end = self._end
+		m._entities = dict(self._entities)
+		m._stamina_life = dict(self._stamina_life)
+		return m
+
+	def get_csr(self):
+		"""
+		description:
+			Return the CSR representation of the edges (offsets, targets, weights).
+		syntax:
+			offsets, targets, weights = fm.get_csr()
+		"""
+		return self._offsets, self._targets, self._weights
+
+	def get_powers(self):
+		"""
+		description:
+			Return the array with the power of the entity located in each vertex.
+		syntax:
+			powers = fm.get_powers()
+		"""
+		return self._powers
+
+	def get_size_parameter(self):
+		"""
+		description:
+			Return the parameter size_parameter.
+		syntax:
+			size_parameter = fm.get_size_parameter()
+		"""
+		return self._size_parameter
+
+	def get_vertices(self):
+		"""
+		description:
+			Returns a list containing all the vertices of the graph.
+		syntax:
+			vertices = fm.get_vertices()
+		"""
+		return list(range(len(self._powers)))
+
+	def get_coordinates(self):
+		"""
+		description:
+			Returns a list containing the coordinates of all the vertices of the graph.
+		syntax:
+			coordinates = fm.get_coordinates()
+		"""
+		return [[v, (x, y)] for v, (x, y) in enumerate(self._coordinates.tolist())]
+
+	def get_edges(self):
+		"""
+		description:
+			Returns a list of lists containing all the edges of the graph.
+			Each list is a triple: [source, destination, weight].
+		syntax:
+			edges = fm.get_edges()
+		"""
+		sources = np.repeat(np.arange(len(self._powers)), np.diff(self._offsets))
+		return [list(edge) for edge in zip(sources.tolist(), self._targets.tolist(), self._weights.tolist())]
+
+	def get_end(self):
+		"""
+		description:
+			Return the end vertex.
+		syntax:
+			end = fm.get_end()
+		"""
+		return self._end
+
+	def get_entities(self):
+		"""
+		description:
+			Return the dictionary containing entities and associated values.
+		syntax:
+			entities = fm.get_entities()
+		"""
+		return dict(self._entities)
+
+	def get_stamina_life(self, path):
+		"""
+		description:
+			Retrieve the stamina and life consumption obtained traversing a path.
+		syntax:
+			stamina, life = fm.get_stamina_life(path)
+		"""
+		stamina = 0
+		for i in range(len(path) - 1):
+			start, stop = self._offsets[path[i]], self._offsets[path[i] + 1]
+			k = start + self._targets[start:stop].tolist().index(path[i + 1])
+			stamina += int(self._weights[k])
+		life = int(self._powers[list(set(path))].sum())
+		return stamina, life
+
+	def starting_edges(self, v):
+		"""
+		description:
+			Returns a list of lists containing all the edges starting from a vertex v.
+			Each list is a triple: [source, destination, weight].
+		syntax:
+			starting_edges = fm.starting_edges(v)
+		"""
+		if not(0 <= v < len(self._powers)):
+			return []
+		start, stop = self._offsets[v], self._offsets[v + 1]
+		return [[v, u, weight] for u, weight in zip(self._targets[start:stop].tolist(), self._weights[start:stop].tolist())]
+
+	def predecessors(self, v):
+		"""
+		description:
+			Returns a list containing the vertices u such that there exists an edge from u to v.
+		syntax:
+			predecessors = fm.predecessors(v)
+		"""
+		if not(0 <= v < len(self._powers)):
+			return []
+		return self._sources[self._reverse_offsets[v]:self._reverse_offsets[v + 1]].tolist()
+
+	def neighbours(self, v):
+		"""
+		description:
+			Returns a list containing the neighbours of a vertex v.
+		syntax:
+			neighbours = fm.neighbours(v)
+		"""
+		if not(0 <= v < len(self._powers)):
+			return []
+		return list(set(self._targets[self._offsets[v]:self._offsets[v + 1]].tolist()) | set(self.predecessors(v)))
+
+	def check_adjacent(self, u, v):
+		"""
+		description:
+			Check whether exists an edge from u to v. Returns a boolean value.
+		syntax:
+			bool = fm.check_adjacent(u, v)
+		"""
+		if not(0 <= u < len(self._powers)):
+			return False
+		return v in self._targets[self._offsets[u]:self._offsets[u + 1]]
+
+	def diff_coordinates(self, start, end):
+		"""
+		description:
+			Compute the "direction" of the edge (as unitary vector in uniform norm).
+		syntax:
+			direction = fm.diff_cooordinates(start, end)
+		"""
+		return tuple(np.sign(self._coordinates[end] - self._coordinates[start]))
+
+	def _search(self, start, end, blacklist = [], heuristic = False):
+		"""
+		description:
+			Dijkstra algorithm (or A* with the Chebyshev heuristic if heuristic is True)
+			over the CSR arrays, same output of m._dijkstra and m._astar.
+		syntax:
+			distance, path = fm._search(start, end)
+		"""
+		n = len(self._powers)
+		if self._dijkstra_buffers is None:
+			self._dijkstra_buffers = ([np.inf] * n, [-1] * n)
+		distances, previous = self._dijkstra_buffers
+		end_x, end_y = self._coordinates[end].tolist()
+		touched = []
+		# heap entries: (distance + heuristic, distance, node)
+		heap = [(0, 0, start)]
+		previous[start] = -1
+		seen = set(blacklist) # blacklisted vertices are avoided
+		result = (np.inf, [])
+		while heap:
+			_, dist, node = heappop(heap)
+			if node not in seen:
+				seen.add(node)
+				if node == end:
+					path = [node]
+					while node != start:
+						node = previous[node]
+						path.append(node)
+					path.reverse()
+					result = (dist, path)
+					break
+				begin, stop = self._offsets[node], self._offsets[node + 1]
+				for neighbour, weight in zip(self._targets[begin:stop].tolist(), self._weights[begin:stop].tolist()):
+					if neighbour not in seen:
+						new_dist = dist + weight
+						if new_dist < distances[neighbour]:
+							distances[neighbour] = new_dist
+							previous[neighbour] = node
+							touched.append(neighbour)
+							if heuristic:
+								x, y = self._coordinates[neighbour].tolist()
+								heappush(heap, (new_dist + max(abs(x - end_x), abs(y - end_y)), new_dist, neighbour))
+							else:
+								heappush(heap, (new_dist, new_dist, neighbour))
+		for node in touched:
+			distances[node] = np.inf
+		return result
+
+	def _dijkstra(self, start, end, blacklist = []):
+		"""
+		description:
+			Dijkstra algorithm over the CSR arrays (see fm._search).
+		syntax:
+			distance, path = fm._dijkstra(start, end)
+		"""
+		return self._search(start, end, blacklist)
+
+	def _astar(self, start, end, blacklist = []):
+		"""
+		description:
+			A* algorithm over the CSR arrays (see fm._search).
+		syntax:
+			distance, path = fm._astar(start, end)
+		"""
+		return self._search(start, end, blacklist, heuristic = True)
+
+	def draw(self, **kwargs):
+		"""
+		description:
+			Draw the map (see m.draw, the drawing is made by networkx from the edges).
+		syntax:
+			fm.draw()
+		"""
+		return self.thaw().draw(**kwargs)
+
+def _compute_stamina_life_branch(arguments):
+	"""
+	description:
+		Worker of m._compute_stamina_life (workers > 1): enumerate the permutations 
+		starting with the entities in first on the (frozen) map fm.
+	syntax:
+		stamina_life, counts = _compute_stamina_life_branch((fm, first, search, precompute))
+	"""
+	fm, first, search, precompute = arguments
+	counts = fm._compute_stamina_life(verbose = True, search = search, precompute = precompute, first = first)
+	return fm._stamina_life, counts
+
+def _generate_seeded_map(arguments):
+	"""
+	description:
+		Worker of generate_maps: generate the map associated to a seed.
+	syntax:
+		m = _generate_seeded_map((seed, bound, repair))
+	"""
+	seed, bound, repair = arguments
+	m = map(generate = bound, repair = repair, seed = seed)
+	m._compute_stamina_life()
+	return m
+
+def generate_maps(seeds, bound, workers = 1, repair = False):
+	"""
+	description:
+		Generate a batch of maps (one for each seed, in the same order) with size
+		parameter bound, m._stamina_life included. Each map uses its own random.Random(seed) instance, hence
+		it is identical to the one obtained with random.seed(seed) and map(generate = bound).
+		If workers > 1 the maps are built in a process pool.
+	syntax:
+		maps = generate_maps(seeds, bound, workers = 4)
+	"""
+	arguments = [(seed, bound, repair) for seed in seeds]
+	if workers <= 1:
+		return [_generate_seeded_map(argument) for argument in arguments]
+	with ProcessPoolExecutor(max_workers = workers) as executor:
+		return list(executor.map(_generate_seeded_map, arguments, chunksize = max(1, len(arguments) // (4 * workers))))
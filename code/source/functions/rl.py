@@ -1,12 +1,47 @@
 import numpy as np
+import time
 
-from functions.itertools_addendum import *
+class lazy_dict(dict):
+	""" 
+	description:
+		Dictionary whose missing keys are created by the function materialize
+		(materialize(key) inserts key, and possibly other keys, in the dictionary).
+	syntax:
+		d = lazy_dict(materialize)
+	"""
+	def __init__(self, materialize):
+		""" 
+		description:
+			Create an empty dictionary; materialize is called with each missing key
+			the first time it is read.
+		syntax:
+			d = lazy_dict(materialize)
+		"""
+		super().__init__()
+		self._materialize = materialize
+
+	def __missing__(self, key):
+		""" 
+		description:
+			Called by d[key] when key is missing: materialize(key) must insert key in d,
+			otherwise KeyError(key) is raised (as for a plain dict). The lookups which
+			do not call __missing__ (get, in, setdefault, ...) do not materialize keys.
+		syntax:
+			value = d[key]
+		"""
+		self._materialize(key)
+		# (dict.__getitem__ would call __missing__ again if key were still missing)
+		if not(dict.__contains__(self, key)):
+			raise KeyError(key)
+		return dict.__getitem__(self, key)
 
 def init_parameters(m, gamemode):
 	""" 
 	description:
 		Initialize the main parameters for the function on_policy_first_visit_mc_control.
 		It also creates start and end.
+		In the gamemode "explorer" the states are created lazily (see lazy_dict)
+		the first time an episode reaches them.
 	syntax:
 		parameters, start, end = init_parameters(m, gamemode)
 	"""
@@ -36,37 +71,199 @@ def init_parameters(m, gamemode):
 					proposed_actions[state] = action
 				action_value[(state, action)] = -np.inf
 		state_value[m.get_end()] = 100 * value
-		end = [m.get_end()]
+		end = set([m.get_end()])
 		start = 0
 	elif gamemode == "explorer":
-		states = []
-		for active_entities in powerset(list(entities.keys())):
-			for vertex in m.get_vertices():
-				states.append((vertex, active_entities))
-		for state in states:
+		# state = (vertex, active_entities) where active_entities is a bitmask:
+		# the i-th entity (in the order of m.get_entities()) is active if the i-th bit is 1
+		bits = {}
+		for entity in entities:
+			bits[entity] = 1 << len(bits)
+		def materialize(state):
+			# creation of the actions, rewards and values of a state (the first time it is reached)
 			available_actions[state], count_returns[state], returns[state], state_value[state] = [], 0, 0, 0
+			if state[0] == m.get_end():
+				state_value[state] = 100 * value
 			maximum = -np.inf
 			for _, arrival_vertex, weight in m.starting_edges(state[0]):
-				if arrival_vertex not in state[1]: # state[1] = active_entities for the state
-					action = (arrival_vertex, state[1])
-				else:
-					new_active_entities = tuple([x for x in state[1] if x != arrival_vertex])
-					action = (arrival_vertex, new_active_entities)
+				action = (arrival_vertex, state[1] & ~bits.get(arrival_vertex, 0))
 				available_actions[state].append(action)
 				rewards[(state, action)] = -weight
-				if arrival_vertex in state[1]:
+				if action[1] != state[1]: # = if arrival_vertex is an active entity
 					rewards[(state, action)] += +20 * entities[arrival_vertex]
 				if rewards[(state, action)] > maximum:
 					maximum = rewards[(state, action)]
 					proposed_actions[state] = action
 				action_value[(state, action)] = -np.inf
-		end = []
-		for active_entities in powerset(entities):
-			state_value[(m.get_end(), active_entities)] = 100 * value
-			end.append((m.get_end(), active_entities))
-		start = (0, tuple(entities.keys()))
+		available_actions, proposed_actions, count_returns, returns, state_value = (lazy_dict(materialize), lazy_dict(materialize),
+			lazy_dict(materialize), lazy_dict(materialize), lazy_dict(materialize))
+		end = set([(m.get_end(), active_entities) for active_entities in range(2 ** len(bits))])
+		start = (0, 2 ** len(bits) - 1)
 	return [available_actions, proposed_actions, rewards, count_returns, returns, state_value, action_value], start, end
 
+def init_arrays(m, gamemode):
+	""" 
+	description:
+		Array-based version of init_parameters: the states (and the actions, which
+		are the arrival states) are mapped to dense integer ids once per map.
+		It returns:
+		- arrays = [next_states, rewards, n_actions, proposed_actions, count_returns, returns, state_value, action_value]
+			where next_states (padded with -1), rewards and action_value have shape (n_states, max_actions)
+			and the other ones have shape (n_states, ) (proposed_actions contains the index of the action);
+		- start (id of the initial state);
+		- is_end (boolean array of the final states);
+		- states (list of the states, i.e. states[id] = state).
+	syntax:
+		arrays, start, is_end, states = init_arrays(m, gamemode)
+	"""
+	if gamemode == "shortest_path":
+		entities = {}
+		value = 1
+	else:
+		entities = m.get_entities()
+		value = 0
+		for power in entities.values():
+			value += power
+	# transitions: for each state the list of (arrival state, reward)
+	transitions = []
+	if gamemode in ["shortest_path", "survivor"]:
+		states = m.get_vertices()
+		for state in states:
+			transitions.append([])
+			for _, action, weight in m.starting_edges(state):
+				transitions[-1].append((action, -weight - 20 * entities.get(action, 0)))
+		end_states = [m.get_end()]
+		start = 0
+	elif gamemode == "explorer":
+		# same bitmask encoding of init_parameters (all the states are created)
+		bits = {}
+		for entity in entities:
+			bits[entity] = 1 << len(bits)
+		states = []
+		for active_entities in range(2 ** len(bits)):
+			for vertex in m.get_vertices():
+				states.append((vertex, active_entities))
+		for state in states:
+			transitions.append([])
+			for _, arrival_vertex, weight in m.starting_edges(state[0]):
+				action = (arrival_vertex, state[1] & ~bits.get(arrival_vertex, 0))
+				if action[1] != state[1]:
+					transitions[-1].append((action, -weight + 20 * entities[arrival_vertex]))
+				else:
+					transitions[-1].append((action, -weight))
+		end_states = [(m.get_end(), active_entities) for active_entities in range(2 ** len(bits))]
+		start = (0, 2 ** len(bits) - 1)
+	ids = {}
+	for state in states:
+		ids[state] = len(ids)
+	n_actions = np.array([len(actions) for actions in transitions], dtype = np.int64)
+	max_actions = max(1, n_actions.max())
+	next_states = np.full((len(states), max_actions), -1, dtype = np.int64)
+	rewards = np.full((len(states), max_actions), -np.inf)
+	for i in range(len(states)):
+		for j in range(len(transitions[i])):
+			next_states[i, j] = ids[transitions[i][j][0]]
+			rewards[i, j] = transitions[i][j][1]
+	# the initial proposed action is the one with maximum reward (the first one in case of ties)
+	proposed_actions = rewards.argmax(axis = 1)
+	count_returns = np.zeros(len(states), dtype = np.int64)
+	returns = np.zeros(len(states))
+	state_value = np.zeros(len(states))
+	is_end = np.zeros(len(states), dtype = bool)
+	for state in end_states:
+		state_value[ids[state]] = 100 * value
+		is_end[ids[state]] = True
+	action_value = np.full((len(states), max_actions), -np.inf)
+	return [next_states, rewards, n_actions, proposed_actions, count_returns, returns, state_value, action_value], ids[start], is_end, states
+
+class legacy_random():
+	""" 
+	description:
+		Reproduces the draws of np.random.random() and np.random.randint(n) of the global 
+		(legacy MT19937) generator from buffers of its raw 32-bit outputs, i.e. without the
+		overhead of the single calls: random() builds a 53-bit double from two outputs and
+		randint(n) uses masked rejection sampling, as the legacy algorithms do.
+		sync() leaves np.random in the same state as if the calls had been made.
+	syntax:
+		draws = legacy_random(size = 1024)
+	"""
+	def __init__(self, size = 1024):
+		""" 
+		description:
+			Store the state of np.random (np.random.get_state(), restored by sync) and draw 
+			the first buffer of size raw 32-bit outputs (np.random.randint(0, 2 ** 32, 
+			dtype = np.uint32) returns the MT19937 outputs unchanged, one per value).
+		syntax:
+			draws = legacy_random(size = 1024)
+		"""
+		self._state = np.random.get_state()
+		self._size = size
+		self._buffer = np.random.randint(0, 2 ** 32, size = size, dtype = np.uint32).tolist()
+		self._index = 0
+		# consumed: number of outputs used before the current buffer
+		self._consumed = 0
+
+	def _refill(self):
+		""" 
+		description:
+			Draw a new buffer of raw outputs from np.random (the stream continues where the
+			previous buffer ended, since np.random has already advanced past it).
+		syntax:
+			draws._refill()
+		"""
+		# the unused outputs are kept and followed by a new buffer, which continues the stream
+		self._consumed += self._index
+		self._buffer = self._buffer[self._index:] + np.random.randint(0, 2 ** 32, size = self._size, dtype = np.uint32).tolist()
+		self._index = 0
+
+	def random(self):
+		""" 
+		description:
+			Same value of np.random.random() (legacy RandomState.random_sample): as NumPy's
+			mt19937_next_double, the 27 high bits of one output and the 26 high bits of the
+			next one form a 53-bit integer, divided by 2^53.
+		syntax:
+			p = draws.random()
+		"""
+		if self._index + 2 > len(self._buffer):
+			self._refill()
+		index = self._index
+		self._index = index + 2
+		return ((self._buffer[index] >> 5) * 67108864.0 + (self._buffer[index + 1] >> 6)) / 9007199254740992.0
+
+	def randint(self, n):
+		""" 
+		description:
+			Same value of np.random.randint(n) (and then of np.random.choice(n)) of the legacy 
+			RandomState: as NumPy's buffered_bounded_masked_uint32 (used when n - 1 fits in 
+			32 bits), each output is masked with the smallest all-ones mask covering n - 1 
+			and rejected if greater than n - 1. For n = 1 no output is consumed.
+		syntax:
+			i = draws.randint(n)
+		"""
+		if n == 1:
+			return 0
+		mask = (1 << (n - 1).bit_length()) - 1
+		while True:
+			if self._index == len(self._buffer):
+				self._refill()
+			value = self._buffer[self._index] & mask
+			self._index += 1
+			if value < n:
+				return value
+
+	def sync(self):
+		""" 
+		description:
+			Leave np.random in the state it would have after the calls of random and randint:
+			the state stored at the creation is restored (np.random.set_state) and advanced 
+			by the outputs actually used (the drawn but unused ones are given back).
+		syntax:
+			draws.sync()
+		"""
+		np.random.set_state(self._state)
+		np.random.randint(0, 2 ** 32, size = self._consumed + self._index, dtype = np.uint32)
+
 def eps_greedy_policy(state, available_actions, proposed_action, eps):
 	""" 
 	description:
@@ -81,7 +278,7 @@ def eps_greedy_policy(state, available_actions, proposed_action, eps):
 		return available_actions[state][np.random.choice(len(available_actions[state]))]
  
 def policy_prediction_and_improvement(available_actions, proposed_actions, rewards, count_returns, returns, state_value, action_value,
-		start, end, eps):
+		start, end, eps, gamma = 0.99, max_episode_length = 1000):
 	""" 
 	description:
 		Main loop of the function on_policy_first_visit_mc_control.
@@ -89,12 +286,11 @@ def policy_prediction_and_improvement(available_actions, proposed_actions, rewar
 		- generation of an episode (following the epsilon-greedy policy);
 		- prediction phase;
 		- improvement phase.
+		gamma is the discount factor and max_episode_length the maximum length of an episode.
 	syntax:
 		policy_prediction_and_improvement(available_actions, proposed_actions, rewards, count_returns, returns, state_value, action_value,
-			start, end, eps)
+			start, end, eps, gamma = 0.99, max_episode_length = 1000)
 	"""
-	# discount factor
-	gamma = 0.99
 	# generate an episode
 	#	initial state
 	state = start
@@ -103,61 +299,333 @@ def policy_prediction_and_improvement(available_actions, proposed_actions, rewar
 	#	max_iteration: maximum number of iteration, it is necessary to guarantee the termination of the function
 	max_iteration = 0
 	#	loop until reaching the end or reaching max_iteration
-	while state not in end and max_iteration < 1000:
+	while state not in end and max_iteration < max_episode_length:
 		action = eps_greedy_policy(state, available_actions, proposed_actions[state], eps)
 		episode.append((state, action))
 		episode_states.append(state)
 		state = action
 		max_iteration += 1
 	# prediction phase
+	#	first_visit[state]: index of the first visit of state in the episode (one forward pass)
+	first_visit = {}
+	for index, state in enumerate(episode_states):
+		if state not in first_visit:
+			first_visit[state] = index
 	#	update returns, action_value
 	total_return = 0
-	for index in range(len(episode)):
-		state, action = episode[-(index + 1)]
+	for index in reversed(range(len(episode))):
+		state, action = episode[index]
 		total_return = gamma * total_return + rewards[(state, action)]
-		if state not in episode_states[:-(index + 1)]:
+		if first_visit[state] == index:
 			count_returns[state] += 1
 			returns[state] += total_return
 			state_value[state] = returns[state] / count_returns[state]
 		# improvement phase
 		action_value[(state, action)] = gamma * state_value[action] + rewards[(state, action)]
-	for state in episode_states:
+	#	the keys of first_visit are the visited states without duplicates
+	for state in first_visit:
 		action_value_state = {}
 		for action in available_actions[state]:
 			action_value_state[action] = action_value[(state, action)]
 		#	proposed_actions[state] = argmax_{action} action_value[(state, action)]
 		proposed_actions[state] = max(action_value_state, key = action_value_state.get)
 
-def on_policy_first_visit_mc_control(m, gamemode):
+def array_mc_update(episode_states, episode_actions, next_states, rewards, proposed_actions, count_returns, returns, state_value, 
+		action_value, gamma = 0.99, short_episode = 64):
 	""" 
 	description:
-		On-policy first-visit MC control algorithm with epsilon-greedy policy.
-		If the algorithm does not find a path it returns False, otherwise
-		it returns a triple stamina, life, path.
+		Prediction and improvement phases over the arrays of init_arrays for one episode
+		(episode_states: visited states, episode_actions: index of the chosen actions).
+		The phases are vectorized:
+		- the first visit of each state is found with np.unique;
+		- action_value[(state, action)] is set by the earliest occurrence of the couple,
+			reading the updated value of the arrival state only if the arrival state
+			has its first visit in the following step (as in the backward loop).
+		Episodes shorter than short_episode steps are processed with the backward loop
+		of policy_prediction_and_improvement instead (the fixed cost of the NumPy calls
+		would dominate), with the same results.
+		It returns the array of the (distinct) visited states, whose proposed action has been updated.
 	syntax:
-		out = on_policy_first_visit_mc_control(m, gamemode)
+		visited_states = array_mc_update(episode_states, episode_actions, next_states, rewards, proposed_actions, count_returns, 
+			returns, state_value, action_value, gamma = 0.99, short_episode = 64)
 	"""
-	# init phase
-	parameters, start, end = init_parameters(m, gamemode)
-	available_actions, proposed_actions, rewards, count_returns, returns, state_value, action_value = parameters
-	# control phase
-	eps = 0.75
-	for _ in range(1000):
-		policy_prediction_and_improvement(available_actions, proposed_actions, rewards, count_returns, returns, state_value, action_value,
-			start, end, eps)
-	# creation of the final path
-	path = [0]
+	if len(episode_states) < short_episode:
+		episode_states = episode_states.tolist()
+		episode_actions = episode_actions.tolist()
+		# prediction phase
+		#	first_visit[state]: index of the first visit of state in the episode
+		first_visit = {}
+		for index, state in enumerate(episode_states):
+			if state not in first_visit:
+				first_visit[state] = index
+		#	update returns, action_value
+		total_return = 0
+		for index in reversed(range(len(episode_states))):
+			state, action = episode_states[index], episode_actions[index]
+			reward = rewards[state, action]
+			total_return = gamma * total_return + reward
+			if first_visit[state] == index:
+				count_returns[state] += 1
+				returns[state] += total_return
+				state_value[state] = returns[state] / count_returns[state]
+			# improvement phase
+			action_value[state, action] = gamma * state_value[next_states[state, action]] + reward
+		visited_states = np.array(list(first_visit))
+		#	proposed_actions[state] = argmax_{action} action_value[(state, action)]
+		proposed_actions[visited_states] = action_value[visited_states].argmax(axis = 1)
+		return visited_states
+	episode_rewards = rewards[episode_states, episode_actions]
+	episode_next = next_states[episode_states, episode_actions]
+	old_arrival_value = state_value[episode_next]
+	# prediction phase
+	#	discounted returns (backward)
+	total_returns = []
+	total_return = 0
+	for reward in reversed(episode_rewards.tolist()):
+		total_return = gamma * total_return + reward
+		total_returns.append(total_return)
+	total_returns = np.array(total_returns[::-1])
+	#	update returns, state_value (first visit)
+	visited_states, first_visit = np.unique(episode_states, return_index = True)
+	count_returns[visited_states] += 1
+	returns[visited_states] += total_returns[first_visit]
+	state_value[visited_states] = returns[visited_states] / count_returns[visited_states]
+	# improvement phase
+	#	updated: the arrival state of the step has its first visit in the following step 
+	#	(the arrival state of the last step is not visited in the episode)
+	updated = np.zeros(len(episode_states), dtype = bool)
+	updated[first_visit[first_visit > 0] - 1] = True
+	arrival_value = np.where(updated, state_value[episode_next], old_arrival_value)
+	couples, first_couple = np.unique(episode_states * action_value.shape[1] + episode_actions, return_index = True)
+	action_value[episode_states[first_couple], episode_actions[first_couple]] = gamma * arrival_value[first_couple] + episode_rewards[first_couple]
+	#	proposed_actions[state] = argmax_{action} action_value[(state, action)]
+	proposed_actions[visited_states] = action_value[visited_states].argmax(axis = 1)
+	return visited_states
+
+def array_policy_prediction_and_improvement(next_states, rewards, n_actions, proposed_actions, count_returns, returns, state_value, 
+		action_value, start, is_end, eps, gamma = 0.99, max_episode_length = 1000, lists = None, draws = None):
+	""" 
+	description:
+		Version of policy_prediction_and_improvement over the arrays of init_arrays
+		(with the same random draws, hence the same results for the same seed).
+		The episode is generated step by step, then it is passed to array_mc_update.
+		The step loop reads lists = [next_states, n_actions, is_end, proposed_actions] 
+		(tolist() copies of the arrays, to avoid the overhead of NumPy scalar indexing): 
+		they are created if lists is None, otherwise the entries of proposed_actions 
+		are refreshed after the update. The random draws are taken from draws (a legacy_random
+		shared by the episodes, the caller has to call draws.sync() at the end); if draws is None
+		a new one is created and synchronized at the end of the episode.
+	syntax:
+		array_policy_prediction_and_improvement(next_states, rewards, n_actions, proposed_actions, count_returns, returns, 
+			state_value, action_value, start, is_end, eps, gamma = 0.99, max_episode_length = 1000, lists = None, draws = None)
+	"""
+	if lists is None:
+		lists = [next_states.tolist(), n_actions.tolist(), is_end.tolist(), proposed_actions.tolist()]
+	next_states_list, n_actions_list, is_end_list, proposed_actions_list = lists
+	# generate an episode (episode_states: visited states, episode_actions: index of the chosen actions)
 	state = start
+	episode_states = []
+	episode_actions = []
 	max_iteration = 0
-	while state not in end and max_iteration < 100:
-		state = proposed_actions[state]
-		if type(state) is tuple: # = if gamemode == "explorer"
-			path.append(state[0])
+	if draws is None:
+		episode_draws = legacy_random()
+	else:
+		episode_draws = draws
+	while not(is_end_list[state]) and max_iteration < max_episode_length:
+		p = episode_draws.random()
+		if p < (1 - eps):
+			action = proposed_actions_list[state]
 		else:
-			path.append(state)
+			action = episode_draws.randint(n_actions_list[state]) # same draw as np.random.choice(n_actions[state])
+		episode_states.append(state)
+		episode_actions.append(action)
+		state = next_states_list[state][action]
 		max_iteration += 1
-	if max_iteration < 100:
+	if draws is None:
+		episode_draws.sync()
+	if episode_states:
+		visited_states = array_mc_update(np.array(episode_states), np.array(episode_actions), next_states, rewards, proposed_actions, 
+			count_returns, returns, state_value, action_value, gamma)
+		for state, action in zip(visited_states.tolist(), proposed_actions[visited_states].tolist()):
+			proposed_actions_list[state] = action
+
+def array_batched_rollouts(next_states, n_actions, proposed_actions, start, is_end, eps, generator, batch_size, 
+		max_episode_length = 1000):
+	""" 
+	description:
+		Generates batch_size episodes in lockstep (following the epsilon-greedy policy
+		given by proposed_actions), drawing the random numbers of each step in bulk 
+		from generator (a numpy.random.Generator).
+		It returns a list of couples (episode_states, episode_actions) of arrays.
+	syntax:
+		episodes = array_batched_rollouts(next_states, n_actions, proposed_actions, start, is_end, eps, generator, batch_size, 
+			max_episode_length = 1000)
+	"""
+	max_iteration = max_episode_length
+	states = np.full(batch_size, start)
+	# alive: indexes of the episodes which have not reached the end
+	alive = np.flatnonzero(np.logical_not(is_end[states]))
+	trajectory_states = np.zeros((max_iteration, batch_size), dtype = np.int64)
+	trajectory_actions = np.zeros((max_iteration, batch_size), dtype = np.int64)
+	lengths = np.zeros(batch_size, dtype = np.int64)
+	iteration = 0
+	while alive.size > 0 and iteration < max_iteration:
+		current_states = states[alive]
+		# p: epsilon-greedy draw, u: uniform choice among the available actions (u * n_actions < n_actions)
+		p, u = generator.random((2, alive.size))
+		actions = np.where(p < (1 - eps), proposed_actions[current_states], (u * n_actions[current_states]).astype(np.int64))
+		trajectory_states[iteration, alive] = current_states
+		trajectory_actions[iteration, alive] = actions
+		lengths[alive] += 1
+		current_states = next_states[current_states, actions]
+		states[alive] = current_states
+		alive = alive[np.logical_not(is_end[current_states])]
+		iteration += 1
+	return [(trajectory_states[:lengths[b], b], trajectory_actions[:lengths[b], b]) for b in range(batch_size) if lengths[b] > 0]
+
+def eps_schedule(schedule, eps, eps_min, episode, episodes):
+	""" 
+	description:
+		Returns the epsilon used in the given episode (0 <= episode < episodes):
+		- schedule = "constant": eps;
+		- schedule = "linear": linear decay from eps to eps_min;
+		- schedule = "exponential": exponential decay from eps to eps_min (both must be positive);
+		- schedule callable: schedule(episode).
+		It raises ValueError for any other schedule.
+	syntax:
+		eps_episode = eps_schedule(schedule, eps, eps_min, episode, episodes)
+	"""
+	if callable(schedule):
+		return schedule(episode)
+	elif schedule == "constant":
+		return eps
+	elif schedule == "linear":
+		return eps + (eps_min - eps) * episode / max(1, episodes - 1)
+	elif schedule == "exponential":
+		if eps <= 0 or eps_min <= 0:
+			raise ValueError("the exponential eps schedule needs eps > 0 and eps_min > 0")
+		return eps * (eps_min / eps) ** (episode / max(1, episodes - 1))
+	else:
+		raise ValueError("unknown eps schedule: " + str(schedule))
+
+def greedy_path(next_state, start, is_end, max_path_length):
+	""" 
+	description:
+		Follows the greedy policy (next_state(state) is the proposed arrival state) from start.
+		It returns the list of the reached states (start excluded) or None if 
+		the end is not reached in less than max_path_length steps.
+	syntax:
+		states = greedy_path(next_state, start, is_end, max_path_length)
+	"""
+	states = []
+	state = start
+	while not(is_end(state)) and len(states) < max_path_length:
+		state = next_state(state)
+		states.append(state)
+	if len(states) < max_path_length:
+		return states
+	else:
+		return None
+
+def on_policy_first_visit_mc_control(m, gamemode, engine = "dict", batch_size = 128, seed = None, eps = 0.75, schedule = "constant", 
+		eps_min = 0.05, episodes = 1000, gamma = 0.99, max_episode_length = 1000, max_path_length = 100, patience = None, stats = False):
+	""" 
+	description:
+		On-policy first-visit MC control algorithm with epsilon-greedy policy.
+		If the algorithm does not find a path it returns False, otherwise
+		it returns a triple stamina, life, path.
+		If engine = "array" the states and actions are mapped to integer ids 
+		and the tables are stored in NumPy arrays (see init_arrays).
+		If engine = "batch" the episodes are generated batch_size at a time
+		(see array_batched_rollouts) with a numpy.random.Generator created from seed;
+		the policy is improved after each batch.
+		Budgets:
+		- eps, schedule, eps_min: epsilon of the policy (see eps_schedule);
+		- episodes: maximum number of episodes;
+		- gamma: discount factor;
+		- max_episode_length: maximum length of an episode;
+		- max_path_length: maximum length of the final path;
+		- patience: if not None the control stops when the greedy path from start
+			reaches the end and does not change for patience consecutive episodes (batches for engine = "batch").
+		An unknown engine or schedule (see eps_schedule) raises ValueError before the init phase.
+		If stats = True it returns out, statistics where statistics is a dictionary
+		with keys "episodes" (number of episodes used), "time" (wall time in seconds)
+		and "converged" (True if the control stopped because of patience).
+	syntax:
+		out = on_policy_first_visit_mc_control(m, gamemode, engine = "dict", batch_size = 128, seed = None, eps = 0.75, 
+			schedule = "constant", eps_min = 0.05, episodes = 1000, gamma = 0.99, max_episode_length = 1000, max_path_length = 100, 
+			patience = None, stats = False)
+	"""
+	if engine not in ["dict", "array", "batch"]:
+		raise ValueError("unknown engine: " + str(engine))
+	# check the schedule before the init phase
+	eps_schedule(schedule, eps, eps_min, 0, episodes)
+	initial_time = time.time()
+	if engine == "dict":
+		# init phase
+		parameters, start, end = init_parameters(m, gamemode)
+		available_actions, proposed_actions, rewards, count_returns, returns, state_value, action_value = parameters
+		next_state, is_end = proposed_actions.__getitem__, end.__contains__
+		# control phase
+		def control(first_episode, eps_episode):
+			policy_prediction_and_improvement(available_actions, proposed_actions, rewards, count_returns, returns, state_value, 
+				action_value, start, end, eps_episode, gamma, max_episode_length)
+			return 1
+	else:
+		# init phase
+		arrays, start, end, states = init_arrays(m, gamemode)
+		next_states, rewards, n_actions, proposed_actions, count_returns, returns, state_value, action_value = arrays
+		next_state, is_end = lambda state: int(next_states[state, proposed_actions[state]]), end.__getitem__
+		# control phase
+		if engine == "array":
+			lists = [next_states.tolist(), n_actions.tolist(), end.tolist(), proposed_actions.tolist()]
+			draws = legacy_random()
+			def control(first_episode, eps_episode):
+				array_policy_prediction_and_improvement(next_states, rewards, n_actions, proposed_actions, count_returns, returns, 
+					state_value, action_value, start, end, eps_episode, gamma, max_episode_length, lists, draws)
+				return 1
+		elif engine == "batch":
+			generator = np.random.default_rng(seed)
+			def control(first_episode, eps_episode):
+				size = min(batch_size, episodes - first_episode)
+				for episode_states, episode_actions in array_batched_rollouts(next_states, n_actions, proposed_actions, start, end, 
+						eps_episode, generator, size, max_episode_length):
+					array_mc_update(episode_states, episode_actions, next_states, rewards, proposed_actions, count_returns, returns, 
+						state_value, action_value, gamma)
+				return size
+	episode = 0
+	stable = 0
+	converged = False
+	path_states = None
+	while episode < episodes and not(converged):
+		episode += control(episode, eps_schedule(schedule, eps, eps_min, episode, episodes))
+		if patience is not None:
+			previous_path_states = path_states
+			path_states = greedy_path(next_state, start, is_end, max_path_length)
+			if path_states is not None and path_states == previous_path_states:
+				stable += 1
+			else:
+				stable = 0
+			converged = stable >= patience
+	if engine == "array":
+		# np.random is left as if the draws had been made one by one
+		draws.sync()
+	# creation of the final path
+	path_states = greedy_path(next_state, start, is_end, max_path_length)
+	if path_states is not None:
+		path = [0]
+		for state in path_states:
+			if engine != "dict":
+				state = states[state]
+			if type(state) is tuple: # = if gamemode == "explorer"
+				path.append(state[0])
+			else:
+				path.append(state)
 		stamina, life = m.get_stamina_life(path)
-		return stamina, life, path
+		out = stamina, life, path
+	else:
+		out = False
+	if stats:
+		return out, {"episodes": episode, "time": time.time() - initial_time, "converged": converged}
 	else:
-		return False
\ No newline at end of file
+		return out